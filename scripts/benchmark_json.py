@@ -0,0 +1,77 @@
+"""
+JSON decoding and encoding benchmark of the component.
+
+Measures the decoding of a search response page with the standard library, orjson (if installed) and the
+incremental decoder used for search pages, and the serialization of array values to JSON strings in the
+default and in the compact format.
+
+Usage:
+    python scripts/benchmark_json.py [--hits 10000] [--runs 5]
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "src"))
+
+from hit_stream import HitStream  # noqa: E402
+from json_codec import dumps_compact, orjson  # noqa: E402
+
+DOCUMENT = {
+    "name": "Product name",
+    "description": "x" * 200,
+    "price": 1234.5,
+    "created_at": "2024-01-31T12:00:00Z",
+    "category": {"id": 12, "path": ["Home", "Garden", "Tools"]},
+    "tags": ["new", "sale"],
+    "variants": [{"sku": "A-1", "stock": 10}, {"sku": "A-2", "stock": 0}],
+}
+
+
+def build_page(hits: int) -> bytes:
+    documents = [
+        {"_index": "products", "_id": str(i), "_score": None, "_source": {"id": i, **DOCUMENT}, "sort": [i]}
+        for i in range(hits)
+    ]
+    response = {"_scroll_id": "scroll", "took": 12, "hits": {"total": {"value": hits}, "hits": documents}}
+    return json.dumps(response).encode()
+
+
+def measure(function, runs: int) -> float:
+    return min(timeit.repeat(function, number=1, repeat=runs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hits", type=int, default=10_000)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    page = build_page(args.hits)
+    print(f"page of {args.hits} hits, {len(page) / 1e6:.1f} MB")
+
+    decoders = {
+        "json.loads": lambda: json.loads(page),
+        "incremental (HitStream)": lambda: list(HitStream(io.BytesIO(page).read).hits()),
+    }
+    if orjson is not None:
+        decoders["orjson.loads"] = lambda: orjson.loads(page)
+    for name, decode in decoders.items():
+        print(f"decode {name}: {measure(decode, args.runs) * 1000:.1f} ms")
+
+    arrays = [value for _ in range(args.hits) for value in DOCUMENT.values() if isinstance(value, list)]
+    encoders = {"json.dumps (default)": json.dumps, "compact": dumps_compact}
+    for name, encode in encoders.items():
+        elapsed = measure(lambda: [encode(value) for value in arrays], args.runs)
+        print(f"encode {len(arrays)} arrays {name}: {elapsed * 1000:.1f} ms")
+
+    if orjson is None:
+        print("orjson is not installed, the compact format uses the standard library")
+
+
+if __name__ == "__main__":
+    main()
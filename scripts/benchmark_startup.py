@@ -0,0 +1,59 @@
+"""
+Startup-time benchmark of the component.
+
+Measures the import time of `src/component.py` in fresh interpreters and the cost of resolving the date
+placeholder shift using the fast path compared to dateparser.
+
+Usage:
+    python scripts/benchmark_startup.py [--runs 10]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import timeit
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "src")
+
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import component; print(time.perf_counter() - t)"
+DATE_SHIFTS = ["today", "yesterday", "3 days ago", "2 weeks ago", "2024-01-31"]
+
+
+def measure_import(runs: int) -> list[float]:
+    timings = []
+    for _ in range(runs):
+        output = subprocess.check_output([sys.executable, "-c", IMPORT_SNIPPET], cwd=SRC_DIR, text=True)
+        timings.append(float(output.strip().splitlines()[-1]))
+    return timings
+
+
+def measure_date_shift(number: int = 200) -> tuple[float, float]:
+    sys.path.insert(0, SRC_DIR)
+    import dateparser
+    from date_shift import resolve_date_shift
+
+    fast = timeit.timeit(lambda: [resolve_date_shift(s) for s in DATE_SHIFTS], number=number)
+    slow = timeit.timeit(lambda: [dateparser.parse(s) for s in DATE_SHIFTS], number=number)
+    calls = number * len(DATE_SHIFTS)
+    return fast / calls, slow / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    timings = measure_import(args.runs)
+    print(
+        f"import component: median {statistics.median(timings) * 1000:.1f} ms, "
+        f"min {min(timings) * 1000:.1f} ms ({args.runs} runs)"
+    )
+
+    fast, slow = measure_date_shift()
+    print(f"date shift: fast path {fast * 1e6:.1f} us/call, dateparser {slow * 1e6:.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Guard against the explosion of columns caused by objects with dynamic keys.
+
+Objects keyed by user-defined values (e.g. `attributes.<customer id>`) are flattened into a new column for every
+distinct key, which makes the output table grow to tens of thousands of mostly empty columns. The guard counts
+the distinct keys of every object path and collapses the paths exceeding the limit: their objects are no longer
+flattened, but written as a single value.
+"""
+
+import logging
+import threading
+from typing import Iterable
+
+
+class KeyCardinalityGuard:
+    def __init__(self, max_keys: int = 100, collapsed: Iterable[str] = (), keep_objects: bool = False):
+        """
+        Parameters:
+            max_keys (int): Maximum number of distinct keys of an object path, before it is collapsed.
+            collapsed (Iterable[str]): Paths collapsed in the previous runs.
+            keep_objects (bool): Collapsed objects are kept in the rows as dictionaries (to be written
+                to a child table), instead of being serialized to a JSON string.
+        """
+        self.max_keys = max_keys
+        self.collapsed = set(collapsed)
+        self.keep_objects = keep_objects
+        self._keys: dict[str, set[str]] = {}
+        # rows are flattened in the download threads
+        self._lock = threading.Lock()
+
+    def collapses(self, path: str, value: dict) -> bool:
+        if path in self.collapsed:
+            return True
+
+        keys = self._keys.get(path)
+        if keys is None:
+            keys = self._keys.setdefault(path, set())
+        keys.update(value)
+        if len(keys) <= self.max_keys:
+            return False
+
+        with self._lock:
+            if path not in self.collapsed:
+                logging.warning(
+                    f"The object {path} has more than {self.max_keys} distinct keys, "
+                    f"it is written as a single value from now on."
+                )
+                self.collapsed.add(path)
+                self._keys.pop(path, None)
+        return True
@@ -1,12 +1,55 @@
-import json
+import collections
+import contextlib
+import copy
+import functools
+import logging
+import threading
+import time
 import typing as t
-from typing import Iterable
+from typing import Collection, Iterable
 
 from elasticsearch import Elasticsearch
-from elasticsearch.exceptions import ApiError, TransportError
+from elasticsearch.exceptions import ApiError, ConnectionTimeout, NotFoundError, TransportError
+from elasticsearch.exceptions import ConnectionError as ESConnectionError
+
+from client.flattener import Flattener
+from client.page_cache import PageCache
+from client.projection import FieldProjection
+from client.search_page import SearchPage, SearchPageSerializer, raw_responses
+from client.throttle import AdaptiveThrottle
+from concurrent_rows import BATCH_SIZE, iter_concurrently
 
 DEFAULT_SIZE = 10_000
 SCROLL_TIMEOUT = "15m"
+SAMPLE_TIMEOUT = "5s"
+# async searches are awaited shorter than the request timeout, so that the submission itself never times out
+ASYNC_WAIT_TIMEOUT = "20s"
+ASYNC_KEEP_ALIVE = "15m"
+ASYNC_POLL_SECONDS = 1
+ASYNC_MAX_POLL_SECONDS = 30
+
+PAGINATION_SCROLL = "scroll"
+PAGINATION_POINT_IN_TIME = "point_in_time"
+
+DEFAULT_PAGE_RETRIES = 5
+RETRY_BACKOFF_SECONDS = 2
+RETRIABLE_STATUS_CODES = (429, 502, 503, 504)
+MAX_CONTEXT_RECOVERIES = 5
+
+THREAD_POOL_CHECK_INTERVAL_SECONDS = 10
+MAX_CONCURRENT_INDICES = 4
+RESOLVE_BATCH_SIZE = 100
+# sort fields whose values identify a document, so that a search can resume after the last hit
+UNIQUE_SORT_FIELDS = ("_id", "_shard_doc")
+# states of the shard copies which serve searches
+SEARCHABLE_SHARD_STATES = ("STARTED", "RELOCATING")
+
+# sequence number preceding the first operation of a shard
+NO_SEQ_NO = -1
+CHANGE_META_FIELDS = ("_id", "_seq_no", "_primary_term")
+
+# called with the index name, the request body and optionally the preference routing the search to a shard
+RowsSource = t.Callable[..., Iterable[dict]]
 
 
 class ElasticsearchClientException(Exception):
@@ -14,8 +57,30 @@ class ElasticsearchClientException(Exception):
 
 
 class ElasticsearchClient(Elasticsearch):
-    def __init__(self, hosts: list, scheme: str = None, http_auth: tuple = None, api_key: tuple = None):
-        options = {"hosts": hosts, "request_timeout": 30, "retry_on_timeout": True, "max_retries": 5}
+    def __init__(
+        self,
+        hosts: list,
+        scheme: str = None,
+        http_auth: tuple = None,
+        api_key: tuple = None,
+        page_retries: int = DEFAULT_PAGE_RETRIES,
+        throttle: AdaptiveThrottle = None,
+        monitor_thread_pool: bool = False,
+        compact_json: bool = False,
+        page_cache: PageCache = None,
+        projection: FieldProjection = None,
+        shard_routing: bool = False,
+        use_async_search: bool = False,
+    ):
+        options = {
+            "hosts": hosts,
+            "request_timeout": 30,
+            "retry_on_timeout": True,
+            "max_retries": 5,
+            # responses with these statuses are retried by _retry, with backoff and the feedback of the throttle
+            "retry_on_status": (),
+            "serializers": {SearchPageSerializer.mimetype: SearchPageSerializer()},
+        }
 
         if scheme == "https":
             options.update({"verify_certs": False, "ssl_show_warn": False})
@@ -27,36 +92,675 @@ class ElasticsearchClient(Elasticsearch):
 
         super().__init__(**options)
 
-    META_FIELDS = ("_id", "_index", "_type", "_score", "_ignored")
+        self.page_retries = page_retries
+        # page size and number of slices of a single index, used without a throttle
+        self.page_size = DEFAULT_SIZE
+        self.slices = 1
+        # parallel downloads of a single index read its shards instead of slices
+        self.shard_routing = shard_routing
+        # searches paged through using search_after are submitted as async searches
+        self.use_async_search = use_async_search
+        self.flattener = Flattener(compact_json, projection)
+        self.page_cache = page_cache
+        self.retried_pages = 0
+        self.recovered_contexts = 0
 
-    def extract_data(self, index_name: str, query: str, include_meta_fields: bool = False) -> Iterable:
+        self.throttle = throttle
+        self.monitor_thread_pool = monitor_thread_pool
+        self._next_thread_pool_check = 0.0
+        self._thread_pool_lock = threading.Lock()
+
+    def extract_data(
+        self,
+        index_name: str | list[str],
+        query: str,
+        include_meta_fields: bool = False,
+        keep_lists: Collection[str] = (),
+        pagination: str = PAGINATION_SCROLL,
+        partitions: list[dict] = None,
+    ) -> Iterable:
         """
         Extracts data from the specified Elasticsearch index based on the given query.
 
         Parameters:
-            index_name (str): Name of the Elasticsearch index.
+            index_name (str | list[str]): Name of the Elasticsearch index, or a list of indices, which are
+                downloaded concurrently.
             query (dict): Elasticsearch DSL query.
             include_meta_fields (bool): When True, merges ES metadata fields (_id, _index, etc.) into each row.
+            keep_lists (Collection[str]): Flattened paths of arrays, which are returned as lists instead of
+                JSON strings. When set, `_id` is always included in the row.
+            pagination (str): `scroll` or `point_in_time` (point in time with `search_after`).
+            partitions (list[dict]): Filters splitting the documents of a single index into partitions, which are
+                downloaded concurrently instead of slices (e.g. time ranges).
+
+        With a throttle allowing more than one concurrent request, the results are downloaded in that many
+        slices in parallel, so the rows are not returned in the order of the query sort. With shard routing,
+        each shard of the index is downloaded on its own instead.
 
         Yields:
             dict
         """
-        response = self.search(index=index_name, size=DEFAULT_SIZE, scroll=SCROLL_TIMEOUT, body=query)
-        for r in self._process_response(response, include_meta_fields):
-            yield r
+        def iter_rows(name: str, body: dict, preference: str = None) -> Iterable[dict]:
+            for page in self._iter_pages(name, body, pagination, preference):
+                yield from self.flattener.process_page(page, include_meta_fields, keep_lists)
+
+        yield from self._extract(index_name, query, iter_rows, BATCH_SIZE, partitions)
+
+    def extract_pages(
+        self,
+        index_name: str | list[str],
+        query: dict,
+        pagination: str = PAGINATION_SCROLL,
+        partitions: list[dict] = None,
+    ) -> Iterable[bytes | dict]:
+        """
+        Extracts the same results as `extract_data`, but returns the raw bodies of the result pages,
+        which are then decoded and flattened by the caller (e.g. in another process) using `SearchPage`.
+
+        Yields:
+            bytes | dict
+        """
+        def iter_bodies(name: str, body: dict, preference: str = None) -> Iterable[bytes | dict]:
+            for page in self._iter_pages(name, body, pagination, preference):
+                yield page.body
+
+        yield from self._extract(index_name, query, iter_bodies, 1, partitions)
+
+    def _extract(
+        self,
+        index_name: str | list[str],
+        query: dict,
+        iter_rows: RowsSource,
+        batch_size: int,
+        partitions: list[dict] = None,
+    ) -> Iterable:
+        slices = self.throttle.max_concurrency if self.throttle else self.slices
+        if isinstance(index_name, list):
+            yield from self._iter_index_rows(index_name, query, iter_rows, batch_size)
+        elif partitions:
+            yield from self._iter_partitioned_rows(index_name, query, iter_rows, partitions, slices, batch_size)
+        elif self.shard_routing:
+            concurrency = slices if slices > 1 else MAX_CONCURRENT_INDICES
+            yield from self._iter_shard_rows(index_name, query, iter_rows, concurrency, batch_size)
+        elif slices > 1:
+            yield from self._iter_sliced_rows(index_name, query, iter_rows, slices, batch_size)
+        else:
+            yield from iter_rows(index_name, query)
+
+        if self.retried_pages or self.recovered_contexts:
+            logging.info(
+                f"Extraction finished after {self.retried_pages} retried page requests "
+                f"and {self.recovered_contexts} recovered search contexts."
+            )
+
+    def sample_data(
+        self, index_name: str | list[str], query: dict, size: int, include_meta_fields: bool = False
+    ) -> list[dict]:
+        """
+        Returns the flattened rows of a small sample of the documents matching the query. Every shard stops
+        collecting documents once it has found `size` of them, so the sample is fast even on large indices.
+        """
+        body = {key: value for key, value in query.items() if key not in ("aggs", "aggregations", "size")}
+        body.update(size=size, terminate_after=size, timeout=SAMPLE_TIMEOUT)
+        page = self._request_page(self.search, index=index_name, body=body)
+        return list(self.flattener.process_page(page, include_meta_fields))
+
+    def resolve_non_empty_indices(self, names: list[str], query: dict) -> list[str]:
+        """
+        Resolves index names or patterns to the existing indices, aliases and data streams using the resolve index
+        API, skipping those with no documents matching the query, which are found cheaply using `_count`. Indices
+        resolved together with a data stream or an alias they belong to are read only once.
+
+        Parameters:
+            names (list[str]): Index names or wildcard patterns, missing ones are ignored.
+            query (dict): Elasticsearch DSL query, its `query` is used to count the matching documents.
+
+        Returns:
+            list[str]: Names of the resolved non-empty indices, in the order of the given names.
+        """
+        indices, aliases, data_streams = [], [], []
+        for start in range(0, len(names), RESOLVE_BATCH_SIZE):
+            batch = names[start:start + RESOLVE_BATCH_SIZE]
+            response = self._retry(
+                self.indices.resolve_index,
+                name=",".join(batch),
+                ignore_unavailable=True,
+                allow_no_indices=True,
+            )
+            indices.extend(response.get("indices", []))
+            aliases.extend(response.get("aliases", []))
+            data_streams.extend(response.get("data_streams", []))
+
+        # a wildcard may match both an alias (or a data stream) and the indices behind it, which are read only once
+        streams = {stream["name"] for stream in data_streams}
+        resolved = dict.fromkeys(index["name"] for index in indices if index.get("data_stream") not in streams)
+        resolved.update(dict.fromkeys(stream["name"] for stream in data_streams))
+        for alias in aliases:
+            targets = alias.get("indices", [])
+            if not any(target in resolved for target in targets):
+                resolved[alias["name"]] = None
+            else:
+                logging.info(f"Reading the targets of alias {alias['name']} directly, some of them were resolved.")
+                resolved.update(dict.fromkeys(targets))
 
-        while len(response["hits"]["hits"]):
-            response = self.scroll(scroll_id=response["_scroll_id"], scroll=SCROLL_TIMEOUT)
-            for r in self._process_response(response, include_meta_fields):
-                yield r
+        logging.info(f"Resolved {len(resolved)} of {len(names)} indices: {list(resolved)}.")
 
-    def _process_response(self, response: dict, include_meta_fields: bool = False) -> Iterable:
-        for hit in response["hits"]["hits"]:
-            row = self.flatten_json(hit["_source"])
-            if include_meta_fields:
-                meta = {field: hit.get(field) for field in self.META_FIELDS if field in hit}
-                row = {**meta, **row}
-            yield row
+        non_empty = []
+        for name in resolved:
+            count = self._retry(self.count, index=name, query=query.get("query"))["count"]
+            if count:
+                non_empty.append(name)
+            else:
+                logging.info(f"Skipping index {name} with no matching documents.")
+        return non_empty
+
+    def get_seq_no_checkpoints(self, index_name: str | list[str]) -> dict:
+        """
+        Returns the global checkpoint of every primary shard of the indices. All operations up to the global
+        checkpoint are processed by all in-sync copies of the shard, so they can be read from any of them.
+
+        Returns:
+            dict: `{index: {"uuid": index UUID, "shards": {shard number: global checkpoint}}}`
+        """
+        stats = self._retry(
+            self.indices.stats,
+            index=index_name,
+            level="shards",
+            filter_path="indices.*.uuid,indices.*.shards.*.routing.primary,indices.*.shards.*.seq_no",
+        )
+        checkpoints = {}
+        for name, index_stats in (stats["indices"] if "indices" in stats else {}).items():
+            shards = {}
+            for shard, copies in index_stats.get("shards", {}).items():
+                primary = next(shard_copy for shard_copy in copies if shard_copy["routing"]["primary"])
+                shards[shard] = primary["seq_no"]["global_checkpoint"]
+            checkpoints[name] = {"uuid": index_stats.get("uuid"), "shards": shards}
+        return checkpoints
+
+    def refresh_indices(self, index_name: str | list[str]) -> bool:
+        """
+        Refreshes the indices after their checkpoints were read. All operations up to the global checkpoint are
+        already indexed by all copies of a shard, but searches see only the operations indexed before the last
+        refresh, which may be far behind with a long (or disabled) refresh interval.
+
+        Returns:
+            bool: False when the refresh is not permitted (the `maintenance` index privilege is missing).
+        """
+        try:
+            self._retry(self.indices.refresh, index=index_name)
+        except ApiError as e:
+            if e.status_code != 403:
+                raise
+            logging.warning(
+                f"The indices cannot be refreshed ({e}), the highest sequence numbers returned are stored instead "
+                "of the checkpoints. Operations not yet refreshed by the cluster may still be missed, "
+                "grant the maintenance privilege to avoid that."
+            )
+            return False
+        return True
+
+    def extract_changes(
+        self,
+        query: dict,
+        since: dict,
+        until: dict,
+        include_meta_fields: bool = False,
+        keep_lists: Collection[str] = (),
+        returned: dict = None,
+    ) -> Iterable:
+        """
+        Extracts documents changed since the previous run, i.e. whose sequence number advanced past the stored
+        checkpoint of their shard. Each shard is read on its own using shard preference routing.
+
+        Parameters:
+            query (dict): Elasticsearch DSL query, its `query` is used as an additional filter.
+            since (dict): Checkpoints of the previous run, as returned by `get_seq_no_checkpoints`. Shards
+                without a checkpoint, or of an index with a different UUID (re-created), are read completely.
+            until (dict): Current checkpoints, as returned by `get_seq_no_checkpoints`.
+            include_meta_fields (bool): When True, merges ES metadata fields (_id, _index, etc.) into each row.
+            keep_lists (Collection[str]): Flattened paths of arrays, which are returned as lists.
+            returned (dict): When given, it is filled with the highest sequence number returned from every shard
+                (or the one the shard was read from, if none was returned), in the format of the checkpoints.
+
+        Yields:
+            dict: Rows including `_id`, `_seq_no` and `_primary_term` of the document.
+        """
+        sources = []
+        for index_name, index_checkpoints in until.items():
+            previous = since.get(index_name, {})
+            if previous and previous.get("uuid") != index_checkpoints["uuid"]:
+                logging.warning(f"Index {index_name} was re-created, all its documents are extracted.")
+                previous = {}
+
+            for shard, checkpoint in index_checkpoints["shards"].items():
+                start = previous.get("shards", {}).get(shard, NO_SEQ_NO)
+                if start > checkpoint:
+                    logging.warning(f"Shard {shard} of index {index_name} was reset, all its documents are extracted.")
+                    start = NO_SEQ_NO
+                if returned is not None:
+                    returned.setdefault(index_name, {"uuid": index_checkpoints["uuid"], "shards": {}})
+                    returned[index_name]["shards"][shard] = start
+                if start == checkpoint:
+                    continue
+
+                body = self._build_changes_query(query, start, checkpoint)
+                pages = functools.partial(
+                    self._iter_search_after_pages, index_name, body, preference=f"_shards:{shard}"
+                )
+                on_page = None
+                if returned is not None:
+                    on_page = functools.partial(self._on_changes_page, returned[index_name]["shards"], shard)
+                sources.append(
+                    functools.partial(self._iter_page_rows, pages, include_meta_fields, keep_lists, on_page)
+                )
+
+        logging.info(f"Extracting changes from {len(sources)} shards with new operations.")
+        if not sources:
+            return []
+        return iter_concurrently(sources, min(len(sources), MAX_CONCURRENT_INDICES))
+
+    @classmethod
+    def _build_changes_query(cls, query: dict, start: int, checkpoint: int) -> dict:
+        seq_no_range = {"range": {"_seq_no": {"gt": start, "lte": checkpoint}}}
+        body = cls._with_filter({key: value for key, value in query.items() if key != "sort"}, seq_no_range)
+        body["sort"] = [{"_seq_no": "asc"}]
+        body["seq_no_primary_term"] = True
+        return body
+
+    @staticmethod
+    def _on_changes_page(shards: dict, shard: str, page: SearchPage) -> None:
+        # the hits are sorted by the sequence number
+        shards[shard] = page.last_hit["_seq_no"]
+
+    def _iter_page_rows(
+        self,
+        pages: t.Callable[[], Iterable[SearchPage]],
+        include_meta_fields: bool,
+        keep_lists: Collection[str],
+        on_page: t.Callable[[SearchPage], None] = None,
+    ) -> Iterable[dict]:
+        for page in pages():
+            yield from self.flattener.process_page(
+                page, include_meta_fields, keep_lists, meta_fields=CHANGE_META_FIELDS
+            )
+            if on_page is not None and page.last_hit is not None:
+                on_page(page)
+
+    def _iter_pages(
+        self, index_name: str, query: dict, pagination: str, preference: str = None
+    ) -> Iterable[SearchPage]:
+        # the searches of a point in time cannot be routed, it is opened on all the shards of the index,
+        # async searches cannot open a scroll
+        if (pagination == PAGINATION_POINT_IN_TIME or self.use_async_search) and preference is None:
+            return self._iter_point_in_time_pages(index_name, query)
+        return self._iter_scroll_pages(index_name, query, preference)
+
+    def _iter_sliced_rows(
+        self, index_name: str, query: dict, iter_rows: RowsSource, slices: int, batch_size: int = BATCH_SIZE
+    ) -> Iterable[dict]:
+        logging.info(f"Downloading the results in {slices} slices with at most {slices} concurrent requests.")
+
+        def download_slice(slice_id: int) -> Iterable[dict]:
+            body = copy.deepcopy(query)
+            body["slice"] = {"id": slice_id, "max": slices}
+            return iter_rows(index_name, body)
+
+        sources = [functools.partial(download_slice, i) for i in range(slices)]
+        return iter_concurrently(sources, slices, batch_size)
+
+    def _iter_shard_rows(
+        self, index_name: str, query: dict, iter_rows: RowsSource, concurrency: int, batch_size: int = BATCH_SIZE
+    ) -> Iterable[dict]:
+        shards = self.get_shard_preferences(index_name)
+        concurrency = max(1, min(concurrency, len(shards)))
+        logging.info(f"Downloading {len(shards)} shards with at most {concurrency} concurrent requests.")
+        sources = [functools.partial(iter_rows, name, query, preference) for name, preference in shards]
+        return iter_concurrently(sources, concurrency, batch_size)
+
+    def get_shard_preferences(self, index_name: str) -> list[tuple[str, str]]:
+        """
+        Finds the shards of the indices using the search shards API and routes the search of each of them to one
+        of its active copies (a relocating copy serves searches until the relocation completes). Replicas are
+        preferred to keep the load off the primaries (which also serve the indexing), spread over as many nodes
+        as possible. A shard without any active copy fails the extraction, instead of missing from the output.
+
+        Returns:
+            list[tuple[str, str]]: Name of the index and the `preference` of the search of each shard.
+        """
+        response = self._retry(self.search_shards, index=index_name)
+        searches_per_node = collections.Counter()
+        shards = []
+        for copies in response["shards"]:
+            active = [shard_copy for shard_copy in copies if shard_copy["state"] in SEARCHABLE_SHARD_STATES]
+            if not active:
+                shard = copies[0] if copies else {}
+                raise ElasticsearchClientException(
+                    f"Shard {shard.get('shard')} of index {shard.get('index')} has no active copy "
+                    f"({', '.join(shard_copy['state'] for shard_copy in copies)}), its documents cannot be extracted."
+                )
+            replicas = [shard_copy for shard_copy in active if not shard_copy["primary"]]
+            chosen = min(replicas or active, key=lambda shard_copy: searches_per_node[shard_copy["node"]])
+            searches_per_node[chosen["node"]] += 1
+            shards.append((chosen["index"], f"_shards:{chosen['shard']}|_prefer_nodes:{chosen['node']}"))
+        return shards
+
+    def _iter_partitioned_rows(
+        self,
+        index_name: str,
+        query: dict,
+        iter_rows: RowsSource,
+        partitions: list[dict],
+        concurrency: int,
+        batch_size: int = BATCH_SIZE,
+    ) -> Iterable[dict]:
+        logging.info(f"Downloading {len(partitions)} partitions with at most {concurrency} concurrent requests.")
+        sources = [
+            functools.partial(iter_rows, index_name, self._with_filter(query, partition)) for partition in partitions
+        ]
+        return iter_concurrently(sources, max(1, concurrency), batch_size)
+
+    @staticmethod
+    def _with_filter(query: dict, query_filter: dict) -> dict:
+        body = {key: value for key, value in query.items() if key != "query"}
+        body["query"] = {"bool": {"filter": [query_filter]}}
+        if "query" in query:
+            body["query"]["bool"]["must"] = [query["query"]]
+        return body
+
+    def _iter_index_rows(
+        self, index_names: list[str], query: dict, iter_rows: RowsSource, batch_size: int = BATCH_SIZE
+    ) -> Iterable[dict]:
+        concurrency = min(len(index_names), MAX_CONCURRENT_INDICES)
+        logging.info(f"Downloading {len(index_names)} indices, {concurrency} at a time.")
+        sources = [functools.partial(iter_rows, name, query) for name in index_names]
+        return iter_concurrently(sources, concurrency, batch_size)
+
+    def _page_size(self) -> int:
+        return self.throttle.page_size if self.throttle else self.page_size
+
+    def _iter_scroll_pages(self, index_name: str, query: dict, preference: str = None) -> Iterable[SearchPage]:
+        params = {"preference": preference} if preference else {}
+        # the page size of a scroll is given by its first request and cannot be adjusted later on
+        page = self._request_page(
+            self.search, index=index_name, size=self._page_size(), scroll=SCROLL_TIMEOUT, body=query, **params
+        )
+        yield page
+        self._finish_page(page)
+
+        while page.has_hits:
+            previous = page
+            try:
+                page = self._request_page(self.scroll, scroll_id=page.envelope["_scroll_id"], scroll=SCROLL_TIMEOUT)
+            except NotFoundError as e:
+                # the scroll context expired, it can only be resumed if the hits are sorted by unique values,
+                # otherwise the documents tied with the last hit would be skipped
+                if "slice" in query:
+                    raise ElasticsearchClientException(
+                        f"Scroll context expired and cannot be recovered, as the scroll is sliced: {e}. "
+                        "Use the point in time pagination to recover expired contexts."
+                    ) from e
+                if not self._ends_with_unique_sort(query.get("sort"), routed=bool(preference)):
+                    raise ElasticsearchClientException(
+                        f"Scroll context expired and cannot be recovered, "
+                        f"as the query has no sort by a unique field: {e}. "
+                        "Specify a sort with a unique tiebreaker field or use the point in time pagination."
+                    ) from e
+
+                last_sort = previous.last_hit["sort"]
+                logging.warning(f"Scroll context expired, resuming the extraction after {last_sort}.")
+                self.recovered_contexts += 1
+                yield from self._iter_search_after_pages(index_name, query, last_sort, **params)
+                return
+            yield page
+            self._finish_page(page)
+
+    @staticmethod
+    def _ends_with_unique_sort(sort, routed: bool = False) -> bool:
+        """
+        True when the last sort key is unique, `_seq_no` only within a single shard, i.e. in a routed search.
+        """
+        if not sort:
+            return False
+        last = sort[-1] if isinstance(sort, list) else sort
+        field = next(iter(last), None) if isinstance(last, dict) else last
+        return field in UNIQUE_SORT_FIELDS or (routed and field == "_seq_no")
+
+    def _iter_search_after_pages(
+        self, index_name: str, query: dict, search_after: list = None, **params
+    ) -> Iterable[SearchPage]:
+        body = copy.deepcopy(query)
+        adaptive_size = "size" not in query
+        while True:
+            if adaptive_size:
+                body["size"] = self._page_size()
+            if search_after is not None:
+                body["search_after"] = search_after
+            page = self._request_page(self._search_request, index=index_name, body=body, **params)
+            yield page
+            self._finish_page(page)
+            if not page.has_hits:
+                return
+            search_after = page.last_hit["sort"]
+
+    def _iter_point_in_time_pages(self, index_name: str, query: dict) -> Iterable[SearchPage]:
+        """
+        Pages through the results using a point in time and `search_after`. Every page request is repeatable,
+        so failed pages are retried without skipping data and an expired point in time is re-opened.
+        """
+        body = copy.deepcopy(query)
+        adaptive_size = "size" not in query
+        # a _shard_doc tiebreaker is added implicitly to any sort used with a point in time
+        body.setdefault("sort", ["_shard_doc"])
+        body["pit"] = {"id": self._open_point_in_time(index_name), "keep_alive": SCROLL_TIMEOUT}
+
+        recoveries = 0
+        try:
+            while True:
+                if adaptive_size:
+                    body["size"] = self._page_size()
+                try:
+                    page = self._request_page(self._search_request, body=body)
+                except NotFoundError as e:
+                    recoveries += 1
+                    if recoveries > MAX_CONTEXT_RECOVERIES:
+                        raise ElasticsearchClientException(f"Point in time repeatedly expired: {e}") from e
+                    logging.warning(f"Point in time expired, re-opening it and resuming the extraction: {e}")
+                    self.recovered_contexts += 1
+                    body["pit"]["id"] = self._open_point_in_time(index_name)
+                    continue
+
+                yield page
+                self._finish_page(page)
+                if "pit_id" in page.envelope:
+                    body["pit"]["id"] = page.envelope["pit_id"]
+                if not page.has_hits:
+                    return
+                body["search_after"] = page.last_hit["sort"]
+        finally:
+            with contextlib.suppress(ApiError, TransportError):
+                self.close_point_in_time(id=body["pit"]["id"])
+
+    @property
+    def _search_request(self) -> t.Callable:
+        return self._async_search if self.use_async_search else self.search
+
+    def _async_search(self, **kwargs) -> dict:
+        """
+        Runs a search using the async search API and returns its response. The search is submitted once and then
+        polled for completion with backoff, so a search running longer than the request timeout is executed
+        by the cluster only once, instead of being repeated by the retries of the client.
+        """
+        # the async search response wraps the search response, it is decoded as a whole
+        with raw_responses(False):
+            response = self.async_search.submit(
+                wait_for_completion_timeout=ASYNC_WAIT_TIMEOUT, keep_alive=ASYNC_KEEP_ALIVE, **kwargs
+            )
+            delay = ASYNC_POLL_SECONDS
+            try:
+                while response["is_running"]:
+                    logging.info(f"Async search {response['id']} is still running, checking again in {delay} s.")
+                    time.sleep(delay)
+                    delay = min(delay * 2, ASYNC_MAX_POLL_SECONDS)
+                    response = self.async_search.get(id=response["id"])
+            finally:
+                if "id" in response:
+                    with contextlib.suppress(ApiError, TransportError):
+                        self.async_search.delete(id=response["id"])
+
+        if "error" in response:
+            raise ElasticsearchClientException(f"Async search failed: {response['error']}")
+        if response["is_partial"]:
+            raise ElasticsearchClientException(
+                f"Async search returned partial results: {response['response'].get('_shards', {}).get('failures')}"
+            )
+        return response["response"]
+
+    def _request_page(self, request: t.Callable, **kwargs) -> SearchPage:
+        # the response body is decoded by the page, one hit at a time
+        with raw_responses():
+            response = self._retry(request, **kwargs)
+        if self.page_cache is not None:
+            self.page_cache.write(getattr(response, "body", response))
+        return SearchPage(response)
+
+    def _finish_page(self, page: SearchPage) -> None:
+        page.consume()
+        if self.throttle and "took" in page.envelope:
+            self.throttle.on_response(page.envelope["took"])
+
+    def _open_point_in_time(self, index_name: str) -> str:
+        return self._retry(self.open_point_in_time, index=index_name, keep_alive=SCROLL_TIMEOUT)["id"]
+
+    def _retry(self, request: t.Callable, **kwargs):
+        """
+        Performs a page request, retrying it with exponential backoff on connection errors
+        and on responses signalling an overloaded or temporarily unavailable cluster.
+        """
+        for attempt in range(self.page_retries + 1):
+            try:
+                return self._perform(request, **kwargs)
+            except (ESConnectionError, ConnectionTimeout, ApiError) as e:
+                if isinstance(e, ApiError) and e.status_code not in RETRIABLE_STATUS_CODES:
+                    raise
+                if isinstance(e, ApiError) and e.status_code == 429 and self.throttle:
+                    self.throttle.on_rejected()
+                if attempt == self.page_retries:
+                    raise
+
+                delay = RETRY_BACKOFF_SECONDS * 2**attempt
+                logging.warning(
+                    f"Page request failed ({e}), retrying in {delay} seconds "
+                    f"(attempt {attempt + 1} of {self.page_retries})."
+                )
+                self.retried_pages += 1
+                time.sleep(delay)
+
+    def _perform(self, request: t.Callable, **kwargs):
+        if not self.throttle:
+            return request(**kwargs)
+
+        self._check_thread_pool()
+        with self.throttle.slot():
+            return request(**kwargs)
+
+    def _check_thread_pool(self) -> None:
+        """
+        Passes the search thread pool stats of the cluster to the throttle, at most once per check interval.
+        """
+        if not self.monitor_thread_pool or not self._thread_pool_lock.acquire(blocking=False):
+            return
+        try:
+            if time.monotonic() < self._next_thread_pool_check:
+                return
+            self._next_thread_pool_check = time.monotonic() + THREAD_POOL_CHECK_INTERVAL_SECONDS
+
+            # the check runs within the page requests, whose responses are left undecoded
+            with raw_responses(False):
+                stats = self.nodes.stats(metric="thread_pool", filter_path="nodes.*.thread_pool.search")
+            nodes = stats["nodes"].values() if "nodes" in stats else []
+            pools = [node["thread_pool"]["search"] for node in nodes]
+            self.throttle.on_thread_pool_stats(
+                queue=sum(pool.get("queue", 0) for pool in pools),
+                threads=sum(pool.get("threads", 0) for pool in pools),
+                rejected=sum(pool.get("rejected", 0) for pool in pools),
+            )
+        except (ApiError, TransportError) as e:
+            # e.g. the monitor cluster privilege is missing, throttling still reacts to the page responses
+            logging.warning(f"Search thread pool stats are not available, the monitoring is disabled: {e}")
+            self.monitor_thread_pool = False
+        finally:
+            self._thread_pool_lock.release()
+
+    def extract_composite_aggregation(self, index_name: str, query: dict) -> Iterable:
+        """
+        Runs the composite aggregation from the query and pages through all its buckets using `after_key`.
+
+        Parameters:
+            index_name (str): Name of the Elasticsearch index.
+            query (dict): Elasticsearch DSL query with a single top-level `composite` aggregation.
+
+        Yields:
+            dict: Bucket keys, document count and values of the sub-aggregations.
+        """
+        body = copy.deepcopy(query)
+        body["size"] = 0
+        body.setdefault("track_total_hits", False)
+
+        aggs = body.get("aggs", body.get("aggregations", {}))
+        composite_aggs = [name for name, agg in aggs.items() if "composite" in agg]
+        if len(composite_aggs) != 1:
+            raise ElasticsearchClientException(
+                "Composite aggregation mode requires exactly one top-level composite aggregation in the query, "
+                f"found {len(composite_aggs)}."
+            )
+        agg_name = composite_aggs[0]
+        composite = aggs[agg_name]["composite"]
+
+        while True:
+            response = self._retry(self.search, index=index_name, body=body)
+            if self.throttle and "took" in response:
+                self.throttle.on_response(response["took"])
+            result = response["aggregations"][agg_name]
+            for bucket in result["buckets"]:
+                yield self.flattener.flatten_bucket(bucket)
+
+            after_key = result.get("after_key")
+            if not result["buckets"] or not after_key:
+                break
+            composite["after"] = after_key
+
+    def extract_sql(self, sql_query: str, query_filter: dict = None) -> tuple[list[str], Iterable[list]]:
+        """
+        Submits an Elasticsearch SQL query and pages through its results using the returned cursor.
+
+        Parameters:
+            sql_query (str): SQL query.
+            query_filter (dict): Optional Elasticsearch DSL query used to filter the results.
+
+        Returns:
+            tuple: Column names known from the first page and an iterable of row arrays in the same order.
+        """
+        response = self._retry(
+            self.sql.query, query=sql_query, filter=query_filter, fetch_size=DEFAULT_SIZE, page_timeout=SCROLL_TIMEOUT
+        )
+        columns = [column["name"] for column in response["columns"]]
+        return columns, self._iter_sql_rows(response)
+
+    def _iter_sql_rows(self, response) -> Iterable[list]:
+        cursor = None
+        try:
+            while True:
+                yield from response["rows"]
+                # API responses support only item access, not dict.get
+                cursor = response["cursor"] if "cursor" in response else None
+                if not cursor:
+                    break
+                response = self._retry(self.sql.query, cursor=cursor, page_timeout=SCROLL_TIMEOUT)
+        finally:
+            # the cursor is closed by Elasticsearch after the last page, it only needs to be cleared when interrupted
+            if cursor:
+                with contextlib.suppress(ApiError, TransportError):
+                    self.sql.clear_cursor(cursor=cursor)
 
     def ping(
         self,
@@ -92,18 +796,3 @@ class ElasticsearchClient(Elasticsearch):
             return True
         except (ApiError, TransportError) as e:
             raise ElasticsearchClientException(e)
-
-    def flatten_json(self, x, out=None, name=""):
-        if out is None:
-            out = dict()
-        if type(x) is dict:
-            for a in x:
-                self.flatten_json(x[a], out, name + a + ".")
-
-        elif type(x) is list:
-            out[name[:-1]] = json.dumps(x)
-
-        else:
-            out[name[:-1]] = x
-
-        return out
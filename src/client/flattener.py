@@ -0,0 +1,113 @@
+"""Flattening of documents and aggregation buckets into output rows."""
+
+import json
+from typing import Collection, Iterable
+
+from client.column_guard import KeyCardinalityGuard
+from client.projection import FieldProjection, TrieState, advance
+from client.search_page import SearchPage
+from json_codec import dumps_compact
+
+META_FIELDS = ("_id", "_index", "_type", "_score", "_ignored")
+
+
+class Flattener:
+    def __init__(
+        self, compact_json: bool = False, projection: FieldProjection = None, guard: KeyCardinalityGuard = None
+    ):
+        self._dumps_list = dumps_compact if compact_json else json.dumps
+        self.projection = projection if projection else None
+        self.guard = guard
+        # meta fields merged into every row, besides those requested by the caller
+        self.meta_fields: tuple[str, ...] = ()
+
+    def process_page(
+        self,
+        page: SearchPage,
+        include_meta_fields: bool = False,
+        keep_lists: Collection[str] = (),
+        meta_fields: Collection[str] = (),
+    ) -> Iterable:
+        # child tables of unnested arrays and collapsed objects are keyed by the _id of the parent document
+        keep_id = bool(keep_lists) or (self.guard is not None and self.guard.keep_objects)
+        meta_fields = tuple(
+            dict.fromkeys(
+                [
+                    *(("_id",) if keep_id else ()),
+                    *meta_fields,
+                    *self.meta_fields,
+                    *(META_FIELDS if include_meta_fields else ()),
+                ]
+            )
+        )
+        for hit in page.hits():
+            row = self.flatten_source(hit["_source"], keep_lists)
+            if meta_fields:
+                meta = {field: hit.get(field) for field in meta_fields if field in hit}
+                row = {**meta, **row}
+            yield row
+
+    def flatten_source(self, source: dict, keep_lists: Collection[str] = ()) -> dict:
+        """
+        Flattens the `_source` of a document, skipping the fields not selected by the projection
+        and collapsing the objects with too many distinct keys.
+        """
+        if self.projection is None:
+            return self.flatten_json(source, keep_lists=keep_lists, guard=self.guard)
+        out = dict()
+        self._flatten_projected(source, out, "", keep_lists, self.projection.include, self.projection.exclude)
+        return out
+
+    def _flatten_projected(
+        self, x, out: dict, name: str, keep_lists: Collection[str], include: TrieState, exclude: list
+    ) -> None:
+        if type(x) is not dict:
+            # only fields selected as a whole are written, not the parents of selected fields
+            if include is None:
+                self.flatten_json(x, out, name, keep_lists, self.guard)
+            return
+
+        for key, value in x.items():
+            key_include = include if include is None else advance(include, key)
+            if key_include == []:
+                continue
+            key_exclude = advance(exclude, key) if exclude else exclude
+            if key_exclude is None:
+                continue
+
+            if key_include is None and not key_exclude:
+                # the whole subtree is selected
+                self.flatten_json(value, out, name + key + ".", keep_lists, self.guard)
+            else:
+                self._flatten_projected(value, out, name + key + ".", keep_lists, key_include, key_exclude)
+
+    def flatten_bucket(self, bucket: dict) -> dict:
+        row = dict(bucket["key"])
+        row["doc_count"] = bucket["doc_count"]
+        for name, value in bucket.items():
+            if name in ("key", "doc_count"):
+                continue
+            # single-value metrics (sum, avg, cardinality, ...) are stored directly under the aggregation name
+            if isinstance(value, dict) and value.keys() <= {"value", "value_as_string"}:
+                row[name] = value.get("value")
+            else:
+                self.flatten_json(value, row, name + ".")
+        return row
+
+    def flatten_json(self, x, out=None, name="", keep_lists: Collection[str] = (), guard: KeyCardinalityGuard = None):
+        if out is None:
+            out = dict()
+        if type(x) is dict:
+            if guard is not None and name and guard.collapses(name[:-1], x):
+                out[name[:-1]] = x if guard.keep_objects else self._dumps_list(x)
+                return out
+            for a in x:
+                self.flatten_json(x[a], out, name + a + ".", keep_lists, guard)
+
+        elif type(x) is list:
+            out[name[:-1]] = x if name[:-1] in keep_lists else self._dumps_list(x)
+
+        else:
+            out[name[:-1]] = x
+
+        return out
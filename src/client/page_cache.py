@@ -0,0 +1,52 @@
+"""
+Cache of the raw search result pages of an extraction.
+
+Each page is stored as one line of a gzip compressed NDJSON file, exactly as it was returned by Elasticsearch,
+so that the output can later be rebuilt from the cache (e.g. with other output options) without querying
+the cluster again.
+"""
+
+import gzip
+import json
+import threading
+from typing import Iterable
+
+from client.search_page import SearchPage
+
+# the pages are compressed while they are downloaded, a fast compression level keeps up with the cluster
+COMPRESS_LEVEL = 1
+
+
+class PageCache:
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.pages = 0
+        self._file = gzip.open(file_path, "wb", compresslevel=COMPRESS_LEVEL)
+        # pages of sliced and multi-index extractions are written from several threads
+        self._lock = threading.Lock()
+
+    def write(self, body: bytes | dict) -> None:
+        if isinstance(body, bytes):
+            # line breaks can appear in a JSON document only as insignificant whitespace
+            line = body.replace(b"\r", b" ").replace(b"\n", b" ")
+        else:
+            line = json.dumps(body).encode()
+        with self._lock:
+            self._file.write(line + b"\n")
+            self.pages += 1
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def read_pages(file_path: str) -> Iterable[SearchPage]:
+    """
+    Reads the pages of a cache file written by `PageCache`.
+
+    Yields:
+        SearchPage
+    """
+    with gzip.open(file_path, "rb") as file:
+        for line in file:
+            if line.strip():
+                yield SearchPage(line)
@@ -0,0 +1,221 @@
+"""
+Pre-flight planning of a document extraction.
+
+Before the extraction starts, the planner counts the matching documents, reads the stats of the primary shards
+and times a small probe page. From these it picks the page size, the pagination and the number of concurrent
+requests, so that small extractions do not pay for opening parallel search contexts and large ones use the cluster
+fully. Optionally, the documents are split by a date field into time partitions holding similar numbers of documents.
+"""
+
+import copy
+import dataclasses
+import logging
+import math
+import time
+from typing import Optional
+
+from client.es_client import (
+    DEFAULT_SIZE,
+    MAX_CONCURRENT_INDICES,
+    PAGINATION_POINT_IN_TIME,
+    PAGINATION_SCROLL,
+    ElasticsearchClient,
+)
+
+# pages of about this size are decoded quickly and do not hold too much memory
+TARGET_PAGE_BYTES = 20 * 1024 * 1024
+MIN_PAGE_SIZE = 1_000
+# opening and closing a point in time costs two more requests, scroll is kept for extractions of a few pages
+POINT_IN_TIME_MIN_PAGES = 10
+# each concurrent request should download at least this many pages to pay off
+MIN_PAGES_PER_REQUEST = 5
+PROBE_SIZE = 100
+# date histogram buckets per time partition, more buckets balance the partitions better
+BUCKETS_PER_PARTITION = 10
+
+
+@dataclasses.dataclass
+class ExtractionPlan:
+    documents: int
+    primary_shards: int
+    store_bytes: int
+    page_size: int
+    pagination: str
+    concurrency: int
+    partitions: list[dict] = dataclasses.field(default_factory=list)
+    estimated_seconds: Optional[float] = None
+
+    def describe(self) -> str:
+        lines = [
+            f"documents matching the query: {self.documents}",
+            f"primary shards: {self.primary_shards}, primary store size: {self.store_bytes / 1024**2:.1f} MB",
+            f"page size: {self.page_size}, pagination: {self.pagination}, concurrent requests: {self.concurrency}",
+        ]
+        if self.partitions:
+            lines.append(f"time partitions: {len(self.partitions)}")
+            lines.extend(f"  {partition}" for partition in self.partitions)
+        if self.estimated_seconds is not None:
+            lines.append(f"estimated duration: {self.estimated_seconds:.0f} seconds")
+        return "\n".join(lines)
+
+
+class ExtractionPlanner:
+    def __init__(self, client: ElasticsearchClient):
+        self.client = client
+
+    def plan(
+        self, index_name: str | list[str], query: dict, max_concurrency: int = 1, time_field: str = ""
+    ) -> ExtractionPlan:
+        """
+        Parameters:
+            index_name (str | list[str]): Name of the index, or a list of indices downloaded concurrently.
+            query (dict): Elasticsearch DSL query.
+            max_concurrency (int): Maximum number of concurrent requests.
+            time_field (str): Date field used to split the documents of a single index into time partitions.
+                When empty, a single index is downloaded in slices.
+
+        Returns:
+            ExtractionPlan
+        """
+        client = self.client
+        documents = client._retry(client.count, index=index_name, query=query.get("query"))["count"]
+        stored_documents, store_bytes = self._get_primaries_stats(index_name)
+        primary_shards = self._get_primary_shards(index_name)
+
+        page_size = DEFAULT_SIZE
+        if stored_documents and store_bytes:
+            page_size = min(DEFAULT_SIZE, max(MIN_PAGE_SIZE, TARGET_PAGE_BYTES * stored_documents // store_bytes))
+        page_size = max(1, min(page_size, documents))
+        pages = math.ceil(documents / page_size)
+        pagination = PAGINATION_POINT_IN_TIME if pages >= POINT_IN_TIME_MIN_PAGES else PAGINATION_SCROLL
+
+        if isinstance(index_name, list):
+            concurrency = min(len(index_name), MAX_CONCURRENT_INDICES)
+        else:
+            concurrency = max(1, min(max_concurrency, primary_shards, pages // MIN_PAGES_PER_REQUEST))
+
+        plan = ExtractionPlan(documents, primary_shards, store_bytes, page_size, pagination, concurrency)
+        if time_field and concurrency > 1 and not isinstance(index_name, list):
+            plan.partitions = self._get_time_partitions(index_name, query, time_field, concurrency)
+        plan.estimated_seconds = self._estimate_seconds(index_name, query, plan)
+        return plan
+
+    def apply(self, plan: ExtractionPlan) -> None:
+        """
+        Sets the page size and the number of concurrent requests of the client. With a throttle, they become
+        its upper limits.
+        """
+        client = self.client
+        client.page_size = plan.page_size
+        client.slices = plan.concurrency
+        if client.throttle:
+            throttle = client.throttle
+            throttle.max_concurrency = min(throttle.max_concurrency, plan.concurrency)
+            throttle.max_page_size = min(throttle.max_page_size, plan.page_size)
+            throttle.min_page_size = min(throttle.min_page_size, throttle.max_page_size)
+            throttle.page_size = throttle.max_page_size
+            client.slices = throttle.max_concurrency
+
+    def _get_primaries_stats(self, index_name: str | list[str]) -> tuple[int, int]:
+        client = self.client
+        stats = client._retry(
+            client.indices.stats,
+            index=index_name,
+            metric="docs,store",
+            filter_path="_all.primaries.docs.count,_all.primaries.store.size_in_bytes",
+        )
+        primaries = stats["_all"]["primaries"] if "_all" in stats else {}
+        return primaries.get("docs", {}).get("count", 0), primaries.get("store", {}).get("size_in_bytes", 0)
+
+    def _get_primary_shards(self, index_name: str | list[str]) -> int:
+        client = self.client
+        settings = client._retry(
+            client.indices.get_settings,
+            index=index_name,
+            name="index.number_of_shards",
+            filter_path="*.settings.index.number_of_shards",
+        )
+        return sum(int(index["settings"]["index"]["number_of_shards"]) for index in dict(settings).values()) or 1
+
+    def _get_time_partitions(self, index_name: str, query: dict, time_field: str, partitions: int) -> list[dict]:
+        """
+        Splits the documents into time ranges holding similar numbers of documents, using a date histogram
+        of the time field. Documents without the field get a partition of their own.
+        """
+        client = self.client
+        bounds = client._retry(
+            client.search,
+            index=index_name,
+            size=0,
+            query=query.get("query"),
+            aggs={
+                "min": {"min": {"field": time_field}},
+                "max": {"max": {"field": time_field}},
+                "missing": {"missing": {"field": time_field}},
+            },
+        )["aggregations"]
+        if bounds["min"]["value"] is None:
+            logging.warning(f"No documents have the time field {time_field}, the documents are not partitioned.")
+            return []
+
+        start, end = int(bounds["min"]["value"]), int(bounds["max"]["value"])
+        interval = max(1, math.ceil((end - start + 1) / (partitions * BUCKETS_PER_PARTITION)))
+        buckets = client._retry(
+            client.search,
+            index=index_name,
+            size=0,
+            query=query.get("query"),
+            aggs={
+                "histogram": {
+                    "date_histogram": {
+                        "field": time_field,
+                        "fixed_interval": f"{interval}ms",
+                        "offset": f"{start % interval}ms",
+                    }
+                }
+            },
+        )["aggregations"]["histogram"]["buckets"]
+
+        # cut the buckets into ranges of about the same number of documents, the first and the last range
+        # are open, so that documents indexed meanwhile are not missed
+        target = sum(bucket["doc_count"] for bucket in buckets) / partitions
+        boundaries = []
+        documents = 0
+        for bucket in buckets:
+            goal = target * (len(boundaries) + 1)
+            # cut before the bucket, unless including it gets the range closer to its share of the documents
+            cut = documents and abs(documents - goal) <= abs(documents + bucket["doc_count"] - goal)
+            if cut and len(boundaries) < partitions - 1:
+                boundaries.append(bucket["key"])
+            documents += bucket["doc_count"]
+
+        ranges = []
+        for lower, upper in zip([None, *boundaries], [*boundaries, None]):
+            bounds_filter = {"format": "epoch_millis"}
+            if lower is not None:
+                bounds_filter["gte"] = lower
+            if upper is not None:
+                bounds_filter["lt"] = upper
+            ranges.append({"range": {time_field: bounds_filter}})
+        if bounds["missing"]["doc_count"]:
+            ranges.append({"bool": {"must_not": [{"exists": {"field": time_field}}]}})
+        return ranges
+
+    def _estimate_seconds(self, index_name: str | list[str], query: dict, plan: ExtractionPlan) -> Optional[float]:
+        """
+        Roughly estimates the duration by extrapolating the time of a small probe page.
+        """
+        if not plan.documents:
+            return 0.0
+
+        client = self.client
+        body = copy.deepcopy({key: value for key, value in query.items() if key not in ("aggs", "aggregations")})
+        body["size"] = min(PROBE_SIZE, plan.page_size)
+        started = time.monotonic()
+        response = client._retry(client.search, index=index_name, body=body)
+        elapsed = time.monotonic() - started
+
+        probe_hits = len(response["hits"]["hits"])
+        if not probe_hits:
+            return None
+        return plan.documents * elapsed / probe_hits / plan.concurrency
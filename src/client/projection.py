@@ -0,0 +1,63 @@
+"""
+Client-side projection of the document fields written to the output.
+
+The include and exclude patterns are dotted paths of `_source` fields, in which `*` matches any single key
+(e.g. `customer.*.id`). A pattern selects the field and everything nested in it. The patterns are compiled into
+tries, which the flattener walks along with the document, so that subtrees which cannot contain a selected field
+are skipped without being visited.
+"""
+
+from typing import Iterable, Optional
+
+WILDCARD = "*"
+
+
+class _Node:
+    __slots__ = ("children", "selected")
+
+    def __init__(self):
+        self.children: dict[str, "_Node"] = {}
+        self.selected = False
+
+
+# State of a trie walk: the nodes matching the path so far, or None once a pattern selected the whole path
+TrieState = Optional[list[_Node]]
+
+
+def _compile(patterns: Iterable[str]) -> _Node:
+    root = _Node()
+    for pattern in patterns:
+        node = root
+        for segment in pattern.split("."):
+            node = node.children.setdefault(segment, _Node())
+        node.selected = True
+    return root
+
+
+def advance(nodes: list[_Node], key: str) -> TrieState:
+    """
+    Advances a trie walk by a key of the document. Keys containing dots advance it by each of their segments.
+    """
+    for segment in key.split(".") if "." in key else (key,):
+        matched = []
+        for node in nodes:
+            for child in (node.children.get(segment), node.children.get(WILDCARD)):
+                if child is not None:
+                    if child.selected:
+                        return None
+                    matched.append(child)
+        nodes = matched
+        if not nodes:
+            break
+    return nodes
+
+
+class FieldProjection:
+    def __init__(self, include: Iterable[str] = (), exclude: Iterable[str] = ()):
+        include, exclude = [p for p in include if p], [p for p in exclude if p]
+        # without include patterns, all fields are included
+        self.include: TrieState = [_compile(include)] if include else None
+        self.exclude: list[_Node] = [_compile(exclude)] if exclude else []
+
+    def __bool__(self) -> bool:
+        return self.include is not None or bool(self.exclude)
@@ -0,0 +1,110 @@
+"""
+Rewriting of search request bodies for exports.
+
+Request bodies are often copied from search applications, which rank the hits by relevance. An export reads all
+the matching documents anyway, so computing the scores, sorting by them and counting the total hits only costs
+the data nodes time. The optimizer runs the query in the filter context (without scoring), replaces the relevance
+order by the index order and removes the features whose results are not written to the output.
+"""
+
+import copy
+
+# with these, the scores change which documents match, or the user asked for them explicitly
+SCORING_KEYS = ("min_score", "rescore", "knn", "rank", "track_scores")
+# parts of the response which are not written to the output
+UNUSED_KEYS = ("highlight", "explain", "profile", "suggest", "aggs", "aggregations")
+# bool query clauses which do not compute a score
+FILTER_CLAUSES = {"filter", "must_not"}
+
+# the cheapest order: scrolls read each shard in the index order, a point in time adds a _shard_doc tiebreaker
+SCROLL_ORDER = ["_doc"]
+POINT_IN_TIME_ORDER = ["_shard_doc"]
+
+
+def optimize_query(query: dict, scroll: bool = True, include_meta_fields: bool = False) -> tuple[dict, list[str]]:
+    """
+    Rewrites the request body for reading all the matching documents.
+
+    Parameters:
+        query (dict): Elasticsearch DSL request body.
+        scroll (bool): The body is used for a scroll, otherwise with a point in time or `search_after`.
+        include_meta_fields (bool): The meta fields, including `_score`, are written to the output, so the scores
+            and the sort are kept.
+
+    Returns:
+        tuple[dict, list[str]]: The rewritten body and the descriptions of the applied changes.
+    """
+    body = copy.deepcopy(query)
+    changes = []
+
+    for key in UNUSED_KEYS:
+        if key in body:
+            del body[key]
+            changes.append(f"removed {key}")
+
+    if not include_meta_fields and not _uses_scores(body):
+        if "query" in body and not _is_filter_context(body["query"]):
+            body["query"] = {"bool": {"filter": [body["query"]]}}
+            changes.append("moved the query into the filter context")
+        if "indices_boost" in body:
+            del body["indices_boost"]
+            changes.append("removed indices_boost")
+        if _is_relevance_order(body.get("sort")):
+            body["sort"] = list(SCROLL_ORDER if scroll else POINT_IN_TIME_ORDER)
+            changes.append(f"sorted by {body['sort'][0]}")
+
+    if scroll:
+        # the total hits are always counted by scrolls, disabling it is rejected
+        if "track_total_hits" in body:
+            del body["track_total_hits"]
+            changes.append("removed track_total_hits")
+    elif body.get("track_total_hits") is not False:
+        body["track_total_hits"] = False
+        changes.append("disabled track_total_hits")
+
+    return body, changes
+
+
+def _uses_scores(body: dict) -> bool:
+    if any(key in body for key in SCORING_KEYS):
+        return True
+    sort = body.get("sort")
+    if sort and not _is_relevance_order(sort) and "_score" in str(sort):
+        return True
+    return _contains_key(body.get("query"), "min_score")
+
+
+def _is_relevance_order(sort) -> bool:
+    """
+    True when the hits are ordered by relevance: without a sort, or sorted only by `_score` descending.
+    """
+    if sort is None:
+        return True
+    if not isinstance(sort, list):
+        sort = [sort]
+    if len(sort) != 1:
+        return False
+    order = sort[0]
+    if order == "_score":
+        return True
+    if isinstance(order, dict) and list(order) == ["_score"]:
+        options = order["_score"]
+        return options == "desc" or (isinstance(options, dict) and options.get("order", "desc") == "desc")
+    return False
+
+
+def _is_filter_context(query: dict) -> bool:
+    if not isinstance(query, dict) or len(query) != 1:
+        return False
+    kind, clauses = next(iter(query.items()))
+    if kind in ("match_all", "constant_score"):
+        return True
+    return kind == "bool" and isinstance(clauses, dict) and bool(clauses) and clauses.keys() <= FILTER_CLAUSES
+
+
+def _contains_key(x, key: str) -> bool:
+    if isinstance(x, dict):
+        return key in x or any(_contains_key(value, key) for value in x.values())
+    if isinstance(x, list):
+        return any(_contains_key(value, key) for value in x)
+    return False
@@ -0,0 +1,122 @@
+"""
+Search result pages, whose hits are decoded one at a time from the raw response body.
+
+While a page is requested within `raw_responses()`, the `SearchPageSerializer` of the client leaves the JSON
+response body undecoded. Only the raw bytes of the page are then held in memory and the hits are decoded
+as they are iterated, instead of decoding the whole page into objects before the first row is written.
+All other responses are decoded as a whole, using orjson (unless it is not installed).
+"""
+
+import contextlib
+import contextvars
+import io
+import json
+import re
+from typing import Iterator, Optional
+
+from hit_stream import HitStream
+
+try:
+    # decodes whole responses considerably faster, but it cannot decode a response incrementally
+    from elasticsearch.serializer import OrjsonSerializer as JsonSerializer
+except ImportError:  # orjson is not installed
+    from elasticsearch.serializer import JsonSerializer
+
+_raw_responses = contextvars.ContextVar("raw_responses", default=False)
+
+_NOT_FOUND_YET = object()
+_SORT_KEY = b'"sort":'
+# the end of the last hit, of the hits array and of the hits object
+_HITS_END = re.compile(r"\s*}\s*]\s*}\s*")
+
+
+@contextlib.contextmanager
+def raw_responses(enabled: bool = True) -> Iterator[None]:
+    token = _raw_responses.set(enabled)
+    try:
+        yield
+    finally:
+        _raw_responses.reset(token)
+
+
+class SearchPageSerializer(JsonSerializer):
+    def loads(self, data: bytes):
+        if _raw_responses.get():
+            return data
+        return super().loads(data)
+
+
+class SearchPage:
+    """
+    A page of search results, its hits can be iterated only once. The other members of the response
+    (`_scroll_id`, `pit_id`, `took`, ...) are available in `envelope` once the hits were consumed.
+    """
+
+    def __init__(self, response):
+        body = getattr(response, "body", response)
+        self.body = body
+        self._stream = None
+        if isinstance(body, bytes):
+            self._stream = HitStream(io.BytesIO(body).read)
+            self.envelope = self._stream.envelope
+            self._hits = self._stream.hits()
+        else:
+            self.envelope = body
+            self._hits = iter(body["hits"]["hits"])
+
+        self.hit_count = 0
+        self._last_hit: Optional[dict] = None
+        self._started = False
+        self._skimmed_hits = False
+
+    @property
+    def has_hits(self) -> bool:
+        return self.hit_count > 0 or self._skimmed_hits
+
+    @property
+    def last_hit(self) -> Optional[dict]:
+        if self._last_hit is _NOT_FOUND_YET:
+            self._last_hit = self._find_last_hit()
+        return self._last_hit
+
+    def hits(self) -> Iterator[dict]:
+        self._started = True
+        for hit in self._hits:
+            self.hit_count += 1
+            self._last_hit = hit
+            yield hit
+
+    def consume(self) -> None:
+        """
+        Decodes the rest of the page, so that the envelope and the last hit are complete. A raw page whose hits
+        were not iterated (e.g. its body is flattened in another process) is only skimmed: the members preceding
+        the hits are decoded and the last hit is looked up once it is needed, without decoding the other hits.
+        """
+        if self._stream is not None and not self._started:
+            self._started = True
+            self._skimmed_hits = self._stream.skim()
+            self._hits = iter(())
+            self._last_hit = _NOT_FOUND_YET if self._skimmed_hits else None
+            return
+        for _ in self.hits():
+            pass
+
+    def _find_last_hit(self) -> dict:
+        # the sort values are serialized as the last member of a hit, the page then ends with those of the last hit
+        position = self.body.rfind(_SORT_KEY)
+        if position >= 0:
+            tail = self.body[position + len(_SORT_KEY):].decode("utf-8")
+            with contextlib.suppress(ValueError):
+                sort, end = json.JSONDecoder().raw_decode(tail)
+                hits_end = _HITS_END.match(tail, end)
+                # only the other members of the response may follow, not the rest of an inner hit or an aggregation
+                if hits_end:
+                    rest = tail[hits_end.end():].rstrip()
+                    if rest == "}" or rest.startswith(",") and isinstance(json.loads("{" + rest[1:]), dict):
+                        return {"sort": sort}
+
+        # e.g. the hits are not sorted or have inner hits after the sort values
+        last_hit = None
+        for last_hit in HitStream(io.BytesIO(self.body).read).hits():
+            pass
+        return last_hit
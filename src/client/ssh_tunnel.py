@@ -7,13 +7,24 @@ import paramiko
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_KEEPALIVE_INTERVAL = 30
+DEFAULT_RECONNECT_ATTEMPTS = 5
+HEALTH_CHECK_INTERVAL = 10
+RECONNECT_BACKOFF_SECONDS = 2
+
 
 class SshTunnelError(Exception):
     pass
 
 
 class SshTunnel:
-    """Pure-paramiko local port forwarder, replacing the unmaintained sshtunnel package."""
+    """
+    Pure-paramiko local port forwarder, replacing the unmaintained sshtunnel package.
+
+    The SSH transport sends keepalives, so that idle sessions are not dropped by the bastion, and a health monitor
+    thread re-establishes the SSH session when the transport dies. Connections forwarded through the dead session
+    fail, but the requests retried by the Elasticsearch client are forwarded through the new one.
+    """
 
     def __init__(
         self,
@@ -25,6 +36,8 @@ class SshTunnel:
         remote_port: int,
         local_host: str = "127.0.0.1",
         local_port: int = 0,
+        keepalive_interval: int = DEFAULT_KEEPALIVE_INTERVAL,
+        reconnect_attempts: int = DEFAULT_RECONNECT_ATTEMPTS,
     ):
         self._ssh_host = ssh_host
         self._ssh_port = ssh_port
@@ -34,38 +47,28 @@ class SshTunnel:
         self._remote_port = remote_port
         self._local_host = local_host
         self._local_port = local_port
+        self._keepalive_interval = keepalive_interval
+        self._reconnect_attempts = reconnect_attempts
         self._client: paramiko.SSHClient | None = None
         self._server: socketserver.ThreadingTCPServer | None = None
         self._thread: threading.Thread | None = None
+        self._monitor: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self.reconnects = 0
 
     @property
     def is_active(self) -> bool:
         return self._server is not None and self._thread is not None and self._thread.is_alive()
 
     def start(self) -> None:
-        self._client = paramiko.SSHClient()
-        self._client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        try:
-            self._client.connect(
-                hostname=self._ssh_host,
-                port=self._ssh_port,
-                username=self._ssh_username,
-                pkey=self._ssh_pkey,
-                allow_agent=False,
-                look_for_keys=False,
-            )
-        except Exception as e:
-            raise SshTunnelError(f"SSH connection failed: {e}") from e
-
-        transport = self._client.get_transport()
+        self._stopped.clear()
+        self._client = self._connect()
+        tunnel = self
 
         class Handler(socketserver.BaseRequestHandler):
             def handle(inner_self):
-                chan = transport.open_channel(
-                    "direct-tcpip",
-                    (self._remote_host, self._remote_port),
-                    inner_self.request.getpeername(),
-                )
+                chan = tunnel._open_channel(inner_self.request.getpeername())
                 if chan is None:
                     return
                 while True:
@@ -86,6 +89,8 @@ class SshTunnel:
         self._server.daemon_threads = True
         self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
         self._thread.start()
+        self._monitor = threading.Thread(target=self._monitor_transport, daemon=True)
+        self._monitor.start()
         logger.info(
             "SSH tunnel started: %s:%d -> %s:%d",
             self._local_host,
@@ -95,6 +100,7 @@ class SshTunnel:
         )
 
     def stop(self) -> None:
+        self._stopped.set()
         if self._server:
             self._server.shutdown()
             self._server = None
@@ -102,3 +108,89 @@ class SshTunnel:
             self._client.close()
             self._client = None
         self._thread = None
+        self._monitor = None
+
+    def _connect(self) -> paramiko.SSHClient:
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            client.connect(
+                hostname=self._ssh_host,
+                port=self._ssh_port,
+                username=self._ssh_username,
+                pkey=self._ssh_pkey,
+                allow_agent=False,
+                look_for_keys=False,
+            )
+        except Exception as e:
+            client.close()
+            raise SshTunnelError(f"SSH connection failed: {e}") from e
+
+        if self._keepalive_interval:
+            client.get_transport().set_keepalive(self._keepalive_interval)
+        return client
+
+    def _is_transport_active(self) -> bool:
+        transport = self._client.get_transport() if self._client else None
+        return transport is not None and transport.is_active()
+
+    def _open_channel(self, origin: tuple) -> paramiko.Channel | None:
+        """
+        Opens a channel to the remote host, re-establishing the SSH session first if its transport is dead,
+        or if it died while opening the channel.
+        """
+        for attempt in range(2):
+            if not self._is_transport_active() and not self._reconnect():
+                return None
+            try:
+                return self._client.get_transport().open_channel(
+                    "direct-tcpip", (self._remote_host, self._remote_port), origin
+                )
+            except (paramiko.SSHException, EOFError, OSError) as e:
+                logger.warning("Opening a forwarded channel failed: %s", e)
+                # a refused forward (e.g. the remote host is restarting) leaves the session usable by the channels
+                # of other connections, it is re-established only if the transport died
+                if attempt or self._is_transport_active():
+                    return None
+        return None
+
+    def _monitor_transport(self) -> None:
+        while not self._stopped.wait(HEALTH_CHECK_INTERVAL):
+            if not self._is_transport_active():
+                logger.warning("SSH transport is not active.")
+                self._reconnect()
+
+    def _reconnect(self) -> bool:
+        """
+        Re-establishes the SSH session with exponential backoff, returns whether the transport is active.
+        Concurrent callers wait for a single reconnection.
+        """
+        with self._lock:
+            if self._is_transport_active():
+                return True
+            for attempt in range(self._reconnect_attempts):
+                if self._stopped.is_set():
+                    return False
+                try:
+                    client = self._connect()
+                except SshTunnelError as e:
+                    delay = RECONNECT_BACKOFF_SECONDS * 2**attempt
+                    logger.warning(
+                        "SSH reconnection attempt %d of %d failed (%s), retrying in %d seconds.",
+                        attempt + 1,
+                        self._reconnect_attempts,
+                        e,
+                        delay,
+                    )
+                    self._stopped.wait(delay)
+                    continue
+
+                if self._client:
+                    self._client.close()
+                self._client = client
+                self.reconnects += 1
+                logger.info("SSH session re-established.")
+                return True
+
+            logger.error("SSH session could not be re-established after %d attempts.", self._reconnect_attempts)
+            return False
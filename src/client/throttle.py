@@ -0,0 +1,107 @@
+"""
+Cluster-load-aware control of the number of concurrent page requests and of the page size.
+
+The controller follows the additive-increase / multiplicative-decrease scheme: every slow page (its `took` time
+above the target), rejected request (429) or growing search thread pool queue halves the concurrency and
+the page size, while a run of fast pages raises the concurrency by one and, once at its ceiling, doubles
+the page size back towards its maximum.
+"""
+
+import contextlib
+import logging
+import threading
+from typing import Iterator
+
+# number of consecutive fast pages before the load is increased
+INCREASE_AFTER_PAGES = 3
+# a page is considered fast when it took less than this fraction of the target time
+FAST_PAGE_RATIO = 0.5
+
+
+class AdaptiveThrottle:
+    def __init__(
+        self,
+        max_concurrency: int = 1,
+        max_page_size: int = 10_000,
+        min_page_size: int = 1_000,
+        target_took_ms: int = 2_000,
+    ):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_page_size = max_page_size
+        self.min_page_size = min(min_page_size, max_page_size)
+        self.target_took_ms = target_took_ms
+
+        # start with a single request at a time and the full page size, the concurrency is raised only once
+        # the cluster proves to respond quickly
+        self.concurrency = 1
+        self.page_size = max_page_size
+
+        self._active = 0
+        self._fast_pages = 0
+        self._last_rejected = None
+        self._condition = threading.Condition()
+
+    @contextlib.contextmanager
+    def slot(self) -> Iterator[None]:
+        """
+        Holds one of the currently allowed concurrent requests, waiting until one is free.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._active < self.concurrency)
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                self._condition.notify_all()
+
+    def on_response(self, took_ms: int) -> None:
+        with self._condition:
+            if took_ms > self.target_took_ms:
+                self._decrease(f"page took {took_ms} ms")
+            elif took_ms < self.target_took_ms * FAST_PAGE_RATIO:
+                self._fast_pages += 1
+                if self._fast_pages >= INCREASE_AFTER_PAGES:
+                    self._increase()
+            else:
+                self._fast_pages = 0
+
+    def on_rejected(self) -> None:
+        with self._condition:
+            self._decrease("request rejected by the cluster")
+
+    def on_thread_pool_stats(self, queue: int, threads: int, rejected: int) -> None:
+        """
+        Reacts to the summed search thread pool stats of all nodes. A queue longer than the thread pool itself
+        or new rejections mean the cluster is saturated by the search load, not necessarily ours.
+        """
+        with self._condition:
+            new_rejections = self._last_rejected is not None and rejected > self._last_rejected
+            self._last_rejected = rejected
+            if new_rejections:
+                self._decrease("search thread pool rejected requests")
+            elif queue > threads:
+                self._decrease(f"search thread pool queue is {queue}")
+
+    def _decrease(self, reason: str) -> None:
+        self._fast_pages = 0
+        concurrency = max(1, self.concurrency // 2)
+        page_size = max(self.min_page_size, self.page_size // 2)
+        if (concurrency, page_size) != (self.concurrency, self.page_size):
+            self.concurrency, self.page_size = concurrency, page_size
+            logging.info(f"Reducing the load ({reason}): {self._describe()}.")
+
+    def _increase(self) -> None:
+        self._fast_pages = 0
+        if self.concurrency < self.max_concurrency:
+            self.concurrency += 1
+        elif self.page_size < self.max_page_size:
+            self.page_size = min(self.max_page_size, self.page_size * 2)
+        else:
+            return
+        logging.info(f"Increasing the load: {self._describe()}.")
+        self._condition.notify_all()
+
+    def _describe(self) -> str:
+        return f"{self.concurrency} concurrent requests of {self.page_size} documents"
@@ -0,0 +1,39 @@
+"""
+Column name normalization to the format supported by Keboola Storage.
+
+Equivalent to the DEFAULT strategy of `keboola.utils.header_normalizer`, which cannot be imported without
+also loading dateparser (the `keboola.utils` package imports its date helpers on import). Normalized names
+are cached, as the same keys are normalized for every extracted row.
+"""
+
+import re
+from typing import List
+
+_FORBIDDEN_CHARS = re.compile(r"[^0-9A-Za-z_]")
+
+
+class ColumnNormalizer:
+    def __init__(self, forbidden_sub: str = "", whitespace_sub: str = "_"):
+        self.forbidden_sub = forbidden_sub
+        self.whitespace_sub = whitespace_sub
+        self._cache = {}
+
+    def normalize_column(self, column: str) -> str:
+        normalized = self._cache.get(column)
+        if normalized is None:
+            normalized = self.whitespace_sub.join(column.split())
+            normalized = _FORBIDDEN_CHARS.sub(self.forbidden_sub, normalized)
+            self._cache[column] = normalized
+        return normalized
+
+    def normalize_header(self, header: List[str]) -> List[str]:
+        normalized_header = []
+        empty_column_id = 1
+
+        for column in header:
+            column = self.normalize_column(column)
+            if not column:
+                column = f"empty_{empty_column_id}"
+                empty_column_id += 1
+            normalized_header.append(column)
+        return normalized_header
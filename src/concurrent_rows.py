@@ -0,0 +1,77 @@
+"""Concurrent download of rows from several sources, shared by the current and the legacy client."""
+
+import queue
+import threading
+from typing import Callable, Iterable, Iterator
+
+BATCH_SIZE = 500
+QUEUE_BATCHES = 4
+
+_SOURCE_DONE = object()
+
+
+def iter_concurrently(
+    sources: list[Callable[[], Iterable[dict]]],
+    concurrency: int,
+    batch_size: int = BATCH_SIZE,
+    queue_batches: int = QUEUE_BATCHES,
+) -> Iterator[dict]:
+    """
+    Downloads the rows of the sources in `concurrency` threads and yields them in the calling thread. Rows are
+    handed over in batches through a bounded queue, so that a slow writer holds back the downloads instead
+    of buffering them.
+
+    The first error raised by a source is raised to the caller, including `SystemExit` (e.g. the SSH client
+    exits on unrecoverable errors), and the other downloads are stopped once the caller stops iterating.
+    """
+    batches = queue.Queue(maxsize=concurrency * queue_batches)
+    pending = queue.SimpleQueue()
+    for source in sources:
+        pending.put(source)
+    stop = threading.Event()
+
+    def put(item) -> None:
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+    def download() -> None:
+        while not stop.is_set():
+            try:
+                source = pending.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                batch = []
+                for row in source():
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        if stop.is_set():
+                            return
+                        put(batch)
+                        batch = []
+                put(batch)
+                put(_SOURCE_DONE)
+            except BaseException as e:
+                put(e)
+                return
+
+    workers = [threading.Thread(target=download, daemon=True) for _ in range(concurrency)]
+    for worker in workers:
+        worker.start()
+
+    try:
+        finished = 0
+        while finished < len(sources):
+            item = batches.get()
+            if item is _SOURCE_DONE:
+                finished += 1
+            elif isinstance(item, BaseException):
+                raise item
+            else:
+                yield from item
+    finally:
+        stop.set()
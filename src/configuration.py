@@ -13,6 +13,29 @@ class AuthType(str, Enum):
     no_auth = "no_auth"
 
 
+class ExtractionMode(str, Enum):
+    hits = "hits"
+    composite_aggregation = "composite_aggregation"
+    sql = "sql"
+    changes = "changes"
+
+
+class Pagination(str, Enum):
+    scroll = "scroll"
+    point_in_time = "point_in_time"
+
+
+class Parallelism(str, Enum):
+    slices = "slices"
+    shards = "shards"
+
+
+class PageCacheMode(str, Enum):
+    disabled = "disabled"
+    write = "write"
+    replay = "replay"
+
+
 class DbConfig(BaseModel):
     hostname: str
     port: int
@@ -54,15 +77,60 @@ class SshOptionsConfig(BaseModel):
     user: Optional[str] = None
     sshHost: Optional[str] = None
     sshPort: int = 22
+    keepalive_interval: int = Field(30, ge=0)
+    reconnect_attempts: int = Field(5, ge=0)
 
 
 class DateConfig(BaseModel):
     append_date: bool = False
     format: str = "%Y-%m-%d"
     shift: str = "yesterday"
+    end_shift: str = ""
     time_zone: str = "UTC"
 
 
+class ThrottlingConfig(BaseModel):
+    enabled: bool = False
+    max_concurrency: int = Field(1, ge=1)
+    min_page_size: int = Field(1_000, ge=1)
+    max_page_size: int = Field(10_000, ge=1)
+    target_took_ms: int = Field(2_000, ge=1)
+    monitor_thread_pool: bool = False
+
+
+class ProjectionConfig(BaseModel):
+    include: list[str] = Field(default_factory=list)
+    exclude: list[str] = Field(default_factory=list)
+
+
+class CollapseMode(str, Enum):
+    json = "json"
+    table = "table"
+
+
+class ColumnGuardConfig(BaseModel):
+    enabled: bool = False
+    max_keys: int = Field(100, ge=1)
+    collapse_to: CollapseMode = CollapseMode.json
+
+
+class TableRouteConfig(BaseModel):
+    value: str
+    table: str
+
+
+class TableRoutingConfig(BaseModel):
+    field: str = ""
+    tables: list[TableRouteConfig] = Field(default_factory=list)
+
+
+class PlanningConfig(BaseModel):
+    enabled: bool = False
+    dry_run: bool = False
+    max_concurrency: int = Field(4, ge=1)
+    time_field: str = ""
+
+
 class Configuration(BaseModel):
     db: DbConfig
     authentication: Optional[AuthenticationConfig] = None
@@ -71,9 +139,24 @@ class Configuration(BaseModel):
     request_body: str = "{}"
     index_name: str = ""
     storage_table: str = "ex-elasticsearch-result"
+    table_routing: TableRoutingConfig = Field(default_factory=TableRoutingConfig)
     primary_keys: list[str] = Field(default_factory=list)
     incremental: bool = False
     include_meta_fields: bool = False
+    compact_json: bool = False
+    encoding_processes: int = Field(1, ge=1)
+    unnest_arrays: list[str] = Field(default_factory=list)
+    projection: ProjectionConfig = Field(default_factory=ProjectionConfig)
+    column_guard: ColumnGuardConfig = Field(default_factory=ColumnGuardConfig)
+    extraction_mode: ExtractionMode = ExtractionMode.hits
+    sql_query: str = ""
+    optimize_query: bool = True
+    pagination: Pagination = Pagination.scroll
+    parallelism: Parallelism = Parallelism.slices
+    async_search: bool = False
+    throttling: ThrottlingConfig = Field(default_factory=ThrottlingConfig)
+    planning: PlanningConfig = Field(default_factory=PlanningConfig)
+    page_cache: PageCacheMode = PageCacheMode.disabled
     scheme: str = "http"
     # Legacy SSH dict — present means legacy mode
     ssh: Optional[dict] = None
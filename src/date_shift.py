@@ -0,0 +1,54 @@
+"""Resolution of date shift strings (e.g. "yesterday", "3 days ago", "2024-01-31") to datetimes."""
+
+import re
+from datetime import datetime, timedelta
+from typing import Optional
+
+_KEYWORD_OFFSETS = {
+    "now": timedelta(0),
+    "today": timedelta(0),
+    "yesterday": timedelta(days=1),
+}
+
+_UNIT_SECONDS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+    "week": 604800,
+}
+
+# both are matched against the lowercased shift
+_RELATIVE_SHIFT = re.compile(r"^(\d+|an?)\s+(second|minute|hour|day|week)s?(\s+ago)?$")
+_ISO_DATE = re.compile(r"^\d{4}-\d{2}-\d{2}([ t]\d{2}:\d{2}(:\d{2}(\.\d+)?)?)?$")
+
+
+def resolve_date_shift(shift: str) -> Optional[datetime]:
+    """
+    Resolves a date shift to a naive datetime, relative to the current local time.
+
+    The common shifts (today, yesterday, "N days ago", ISO dates) are resolved directly. Anything else
+    falls back to dateparser, which is imported only in that case as it is expensive to load.
+
+    Returns:
+        datetime or None, if the value could not be parsed.
+    """
+    _shift = shift.strip().lower()
+
+    if _shift in _KEYWORD_OFFSETS:
+        return datetime.now() - _KEYWORD_OFFSETS[_shift]
+
+    if match := _RELATIVE_SHIFT.match(_shift):
+        amount, unit, _ = match.groups()
+        amount = 1 if amount in ("a", "an") else int(amount)
+        return datetime.now() - timedelta(seconds=amount * _UNIT_SECONDS[unit])
+
+    if _ISO_DATE.match(_shift):
+        try:
+            return datetime.fromisoformat(_shift.upper())
+        except ValueError:
+            pass
+
+    import dateparser
+
+    return dateparser.parse(shift)
@@ -0,0 +1,153 @@
+"""Incremental decoding of search responses, shared by the current and the legacy client."""
+
+import codecs
+import json
+import re
+from typing import Callable, Iterator, Optional
+
+CHUNK_SIZE = 64 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER_CONTINUATION = ".eE"
+
+
+class HitStream:
+    """
+    Incrementally decodes a search response body and yields the documents from `hits.hits` one at a time,
+    so that a whole page never has to be held in memory.
+
+    All other members of the response (e.g. `_scroll_id`, `hits.total`) are collected in `envelope`
+    and are available once the hits were consumed.
+    """
+
+    def __init__(self, read: Callable[[int], bytes], chunk_size: int = CHUNK_SIZE):
+        self._read = read
+        self._chunk_size = chunk_size
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json_decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+        self.envelope = {}
+
+    @property
+    def scroll_id(self) -> Optional[str]:
+        return self.envelope.get("_scroll_id")
+
+    @property
+    def total(self):
+        return self.envelope.get("hits", {}).get("total")
+
+    def hits(self) -> Iterator[dict]:
+        for key in self._iter_object_keys():
+            if key == "hits" and self._peek() == "{":
+                self.envelope["hits"] = {}
+                for hits_key in self._iter_object_keys():
+                    if hits_key == "hits" and self._peek() == "[":
+                        yield from self._iter_array()
+                    else:
+                        self.envelope["hits"][hits_key] = self._decode_value()
+            else:
+                self.envelope[key] = self._decode_value()
+
+    def skim(self) -> bool:
+        """
+        Decodes the members of the response preceding the hits (e.g. `_scroll_id`, `pit_id`, `took`), without
+        decoding the hits themselves. Returns whether there are any hits.
+        """
+        for key in self._iter_object_keys():
+            if key == "hits" and self._peek() == "{":
+                self.envelope["hits"] = {}
+                for hits_key in self._iter_object_keys():
+                    if hits_key == "hits" and self._peek() == "[":
+                        self._expect("[")
+                        return self._peek() != "]"
+                    self.envelope["hits"][hits_key] = self._decode_value()
+            else:
+                self.envelope[key] = self._decode_value()
+        return False
+
+    def consume(self) -> int:
+        """Reads the rest of the response and returns the number of skipped hits."""
+        return sum(1 for _ in self.hits())
+
+    def _iter_object_keys(self) -> Iterator[str]:
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+
+        while True:
+            key = self._decode_value()
+            self._expect(":")
+            yield key
+
+            separator = self._peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            elif separator != ",":
+                raise ValueError(f"Expected ',' or '}}' in JSON object, got {separator!r}.")
+
+    def _iter_array(self) -> Iterator:
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+
+        while True:
+            yield self._decode_value()
+
+            separator = self._peek()
+            self._pos += 1
+            if separator == "]":
+                return
+            elif separator != ",":
+                raise ValueError(f"Expected ',' or ']' in JSON array, got {separator!r}.")
+
+    def _expect(self, char: str) -> None:
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON response, got {found!r}.")
+        self._pos += 1
+
+    def _peek(self) -> Optional[str]:
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if self._eof:
+                return None
+            self._fill()
+
+    def _decode_value(self):
+        self._peek()
+        while True:
+            try:
+                value, end = self._json_decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+                self._fill()
+                continue
+
+            # a number at the end of the buffer may continue in the next chunk (e.g. "12" + "3" or "1" + ".5")
+            if not self._eof and (end == len(self._buffer) or self._buffer[end] in _NUMBER_CONTINUATION):
+                self._fill()
+                continue
+
+            self._pos = end
+            return value
+
+    def _fill(self) -> None:
+        # read at least as much as is already buffered, so that large documents are not re-decoded too often
+        size = max(self._chunk_size, len(self._buffer) - self._pos)
+        chunk = self._read(size)
+        if not chunk:
+            self._eof = True
+            text = self._text_decoder.decode(b"", final=True)
+        else:
+            text = self._text_decoder.decode(chunk)
+
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
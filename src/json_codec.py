@@ -0,0 +1,25 @@
+"""
+JSON encoding using orjson, falling back to the standard library where orjson is not installed.
+
+orjson is a dependency of the component, the code runs without it as well. Its output is always compact (no spaces
+after separators, non-ASCII characters are not escaped), so it is used only where compact output was requested and
+the default output stays identical to `json.dumps`.
+"""
+
+import json
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - e.g. a local environment without orjson
+    orjson = None
+
+
+def dumps_compact(value: Any) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode()
+        except TypeError:
+            # e.g. integers exceeding 64 bits, which are supported by the standard library only
+            pass
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
@@ -1,16 +1,22 @@
+import copy
+import functools
 import json
 import logging
 from dataclasses import dataclass
+from typing import Iterator
 from keboola.csvwriter import ElasticDictWriter
 import csv
 
-import dateparser
 import pytz
 from keboola.component.base import ComponentBase
 from keboola.component.exceptions import UserException
 
+from date_shift import resolve_date_shift
 from legacy_client.ssh_client import SshClient
 from legacy_client.result import Fetcher
+from concurrent_rows import iter_concurrently
+from hit_stream import HitStream
+from legacy_client.response_stream import CurlResponse
 
 KEY_INDEX_NAME = "index_name"
 KEY_REQUEST_BODY = "request_body"
@@ -36,6 +42,11 @@ KEY_DB_HOST = "hostname"
 KEY_DB_PORT = "port"
 
 KEY_DEBUG = "debug"
+KEY_COMPRESSION = "compression"
+KEY_SLICES = "slices"
+
+SLICE_PARAM = "slice"
+SSH_MAX_SESSIONS = 10
 
 MANDATORY_PARAMS = [KEY_INDEX_NAME, KEY_DB, KEY_STORAGE_TABLE, KEY_SSH]
 
@@ -56,6 +67,8 @@ class Database:
 
 class LegacyClient(ComponentBase):
     BATCH_PROCESSING_SIZE = 100000
+    SLICE_BATCH_SIZE = 500
+    SLICE_QUEUE_BATCHES = 4
 
     def __init__(self):
         super().__init__()
@@ -75,7 +88,9 @@ class LegacyClient(ComponentBase):
         _ssh_object = self._parse_ssh_parameters()
         self.index, self.index_params = self._parse_index_parameters()
 
-        self.client = SshClient(_ssh_object, _db_object)
+        self.client = SshClient(
+            _ssh_object, _db_object, compress=self.configuration.parameters.get(KEY_COMPRESSION, True)
+        )
 
         self.fetcher = Fetcher(
             self.tables_out_path,
@@ -118,7 +133,7 @@ class LegacyClient(ComponentBase):
         request_body_string = _req_body if _req_body != "" else "{}"
 
         if "{{date}}" in index:
-            _date = dateparser.parse(date_config.get(KEY_DATE_SHIFT, "yesterday"))
+            _date = resolve_date_shift(date_config.get(KEY_DATE_SHIFT, "yesterday"))
 
             if _date is None:
                 raise UserException(f"Could not parse value {date_config[KEY_DATE_SHIFT]} to date.")
@@ -151,19 +166,82 @@ class LegacyClient(ComponentBase):
 
         return index, request_body
 
-    def parse_curl_stdout(self, stdout):
-        stdout_split = stdout.split("\r\n\r\n")
-        rsp_status = stdout_split[0].split(" ")[1]
-        rsp_body = stdout_split[1]
-        return rsp_status, rsp_body
+    @staticmethod
+    def open_page(stdout, stderr, empty_message: str) -> HitStream:
+        """
+        Reads the HTTP status of a cURL response and returns a stream of hits of the returned page.
+        """
+        response = CurlResponse(stdout)
+        try:
+            status = response.read_status()
+        except ValueError as e:
+            raise UserException(f"Could not parse cURL response - {e}.")
+
+        if status is None:
+            _err = stderr.read().decode().strip()
+            raise UserException(empty_message.format(stderr=_err) if _err else "No data returned.")
+
+        if status != "200":
+            raise UserException(f"Could not download data. Error: {response.read_text()}.")
 
-    def parse_scroll(self, scroll_response):
+        return HitStream(response.read)
+
+    def iter_page_rows(self, page: HitStream) -> Iterator[dict]:
+        """
+        Flattens the hits of a page as they are decoded, so that they can be written directly to the output.
+        """
         try:
-            scroll_json = json.loads(scroll_response)
+            for hit in page.hits():
+                yield self.fetcher.flatten_json(hit)
         except ValueError as e:
             raise UserException(f"Could not parse JSON response - {e}.")
 
-        return scroll_json.get("_scroll_id"), scroll_json["hits"]["total"], scroll_json["hits"]["hits"]
+    def iter_scroll_rows(self, index_params: dict, name: str = None) -> Iterator[dict]:
+        """
+        Downloads all pages of a single scroll and yields flattened rows.
+        """
+        _fp_out, _fp_err = self.client.get_first_page(self.index, index_params)
+        logging.debug("Parsing first page.")
+        page = self.open_page(_fp_out, _fp_err, "Could not download data. Error: {stderr}")
+
+        is_first_page = True
+        while True:
+            _page_size = 0
+            for row in self.iter_page_rows(page):
+                _page_size += 1
+                yield row
+
+            if is_first_page:
+                logging.info(f"{page.total} rows will be downloaded from {name or 'index ' + self.index}.")
+                is_first_page = False
+
+            _scroll_id = page.scroll_id
+            if _page_size < self.client._default_size:
+                break
+
+            _scroll_out, _scroll_err = self.client.get_scroll(_scroll_id)
+            page = self.open_page(
+                _scroll_out,
+                _scroll_err,
+                f"Could not download data for scroll {_scroll_id}.\n" + "STDERR: {stderr}.",
+            )
+
+    def iter_sliced_rows(self, slices: int) -> Iterator[dict]:
+        """
+        Runs a sliced scroll, each slice on its own SSH exec channel, see `iter_concurrently`.
+        """
+        logging.info(f"Downloading index {self.index} in {slices} concurrent slices.")
+        return iter_concurrently(
+            [functools.partial(self._iter_slice_rows, slice_id, slices) for slice_id in range(slices)],
+            slices,
+            self.SLICE_BATCH_SIZE,
+            self.SLICE_QUEUE_BATCHES,
+        )
+
+    def _iter_slice_rows(self, slice_id: int, slices: int) -> Iterator[dict]:
+        index_params = copy.deepcopy(self.index_params)
+        index_params[SLICE_PARAM] = {"id": slice_id, "max": slices}
+        return self.iter_scroll_rows(index_params, name=f"slice {slice_id + 1}/{slices}")
 
     def run(self):
         previous_state = self.get_state_file()
@@ -172,70 +250,29 @@ class LegacyClient(ComponentBase):
             logging.info(f"Using table columns from state file: {columns}")
         else:
             columns = []
-        is_complete = False
 
-        _fp_out, _fp_err = self.client.get_first_page(self.index, self.index_params)
-
-        if _fp_out == "" and _fp_err != "":
-            raise UserException(f"Could not download data. Error: {_fp_err}")
-
-        elif _fp_out == "" and _fp_err == "":
-            raise UserException("No data returned.")
-
-        else:
-            pass
+        slices = self.configuration.parameters.get(KEY_SLICES, 1)
+        if not isinstance(slices, int) or slices < 1:
+            raise UserException(f"Parameter \"{KEY_SLICES}\" must be a positive integer, got {slices}.")
 
-        logging.debug("Parsing first page.")
-        stdout_sc, stdout_body = self.parse_curl_stdout(_fp_out)
-
-        if stdout_sc != "200":
-            raise UserException(f"Could not download data. Error: {stdout_body}.")
+        if slices > SSH_MAX_SESSIONS:
+            logging.warning(
+                f"Using {slices} slices. SSH servers allow {SSH_MAX_SESSIONS} concurrent sessions per connection "
+                "by default (MaxSessions), additional slices may be rejected."
+            )
 
+        if slices > 1:
+            rows = self.iter_sliced_rows(slices)
         else:
-            _scroll_id, _nr_results, _results = self.parse_scroll(stdout_body)
-
-        logging.info(f"{_nr_results} rows will be downloaded from index {self.index}.")
-        all_results = [self.fetcher.flatten_json(r) for r in _results]
+            rows = self.iter_scroll_rows(self.index_params)
 
         already_written = 0
         with ElasticDictWriter(
             self.fetcher.get_table_path(), fieldnames=columns, restval="", quoting=csv.QUOTE_ALL, quotechar='"'
         ) as wr:
-            for row in self.fetcher.fetch_results(all_results):
+            for row in rows:
                 wr.writerow(row)
-
-            already_written += len(_results)
-
-            if len(_results) < self.client._default_size:
-                is_complete = True
-
-            while not is_complete:
-                _scroll_out, _scroll_err = self.client.get_scroll(_scroll_id)
-
-                if _scroll_out == "":
-                    raise UserException(
-                        f"Could not download data for scroll {_scroll_id}.\n" + f"STDERR: {_scroll_err}."
-                    )
-
-                else:
-                    pass
-
-                stdout_sc, stdout_body = self.parse_curl_stdout(_scroll_out)
-
-                if stdout_sc != "200":
-                    raise UserException(f"Could not download data. Error: {stdout_body}.")
-
-                else:
-                    _scroll_id, _, _results = self.parse_scroll(stdout_body)
-
-                all_results = [self.fetcher.flatten_json(r) for r in _results]
-
-                if len(_results) < self.client._default_size:
-                    is_complete = True
-
-                for row in self.fetcher.fetch_results(all_results):
-                    wr.writerow(row)
-                already_written += len(_results)
+                already_written += 1
 
                 if already_written % self.BATCH_PROCESSING_SIZE == 0:
                     logging.info(f"Parsed {already_written} results so far.")
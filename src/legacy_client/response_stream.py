@@ -0,0 +1,85 @@
+import zlib
+from typing import Optional
+
+from hit_stream import CHUNK_SIZE
+
+HEADER_SEPARATOR = b"\r\n\r\n"
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+class CurlResponse:
+    """
+    Wraps the stdout stream of a `curl -i` command and splits it into the HTTP status line,
+    headers and a body, which can be read incrementally.
+    """
+
+    def __init__(self, stream, chunk_size: int = CHUNK_SIZE):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._pending = b""
+        self._decompressor = None
+        self.status = None
+        self.headers = {}
+
+    def read_status(self) -> Optional[str]:
+        """
+        Reads the response headers. Informational (1xx) responses printed by curl are skipped.
+
+        Returns:
+            str: HTTP status code of the final response or None, if the stream is empty.
+        """
+        buffer = b""
+        while True:
+            while HEADER_SEPARATOR not in buffer:
+                chunk = self._stream.read(self._chunk_size)
+                if not chunk:
+                    if buffer.strip():
+                        raise ValueError(f"Incomplete HTTP response headers: {buffer.decode(errors='replace')}")
+                    return None
+                buffer += chunk
+
+            header_block, buffer = buffer.split(HEADER_SEPARATOR, 1)
+            lines = header_block.decode(errors="replace").strip().split("\r\n")
+            self.status = lines[0].split(" ")[1]
+            self.headers = {}
+            for line in lines[1:]:
+                name, _, value = line.partition(":")
+                self.headers[name.strip().lower()] = value.strip()
+
+            if not self.status.startswith("1"):
+                self._pending = buffer
+                if self.headers.get("content-encoding") == "gzip":
+                    self._decompressor = zlib.decompressobj(GZIP_WBITS)
+                return self.status
+
+    def read(self, size: int = CHUNK_SIZE) -> bytes:
+        """
+        Reads up to `size` bytes of the response body. Gzip encoded bodies are decompressed on the fly.
+        """
+        if self._decompressor is None:
+            return self._read_raw(size)
+
+        while True:
+            data = self._decompressor.unconsumed_tail
+            if not data:
+                if self._decompressor.eof:
+                    return b""
+                data = self._read_raw(size)
+                if not data:
+                    return self._decompressor.flush()
+
+            decompressed = self._decompressor.decompress(data, size)
+            if decompressed:
+                return decompressed
+
+    def _read_raw(self, size: int) -> bytes:
+        if self._pending:
+            chunk, self._pending = self._pending[:size], self._pending[size:]
+            return chunk
+        return self._stream.read(size)
+
+    def read_text(self) -> str:
+        chunks = []
+        while chunk := self.read():
+            chunks.append(chunk)
+        return b"".join(chunks).decode(errors="replace").strip()
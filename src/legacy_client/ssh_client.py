@@ -3,6 +3,7 @@ import json
 import logging
 import socket
 import sys
+import threading
 from typing import List, Tuple
 from retry import retry
 import paramiko
@@ -22,8 +23,10 @@ SSH_COMMAND_TIMEOUT = 60  # this is in seconds
 
 
 class SshClient:
-    def __init__(self, SshTunnel, Database):
+    def __init__(self, SshTunnel, Database, compress=True):
         self.SshTunnel = SshTunnel
+        self.compress = compress
+        self._connection_lock = threading.Lock()
 
         pkey_file = io.StringIO(SshTunnel.key)
         self.pkey = self._parse_private_key(pkey_file)
@@ -37,6 +40,13 @@ class SshClient:
         self.db = Database
         self._default_size = DEFAULT_SIZE
 
+    def get_headers(self) -> Headers:
+        headers = [("Content-Type", "application/json")]
+        if self.compress:
+            # curl is not run with --compressed, so the gzipped body travels over SSH and is decompressed locally
+            headers.append(("Accept-Encoding", "gzip"))
+        return headers
+
     def connect_ssh(self):
         try:
             self.ssh.connect(
@@ -49,6 +59,16 @@ class SshClient:
             logging.exception("Could not establish SSH tunnel. Check that all SSH parameters are correct.")
             sys.exit(1)
 
+    def reconnect_ssh(self, failed_transport):
+        """
+        Re-establishes the SSH connection, unless another thread (e.g. a concurrent scroll slice)
+        has already replaced the failed transport.
+        """
+        with self._connection_lock:
+            transport = self.ssh.get_transport()
+            if transport is None or transport is failed_transport or not transport.is_active():
+                self.connect_ssh()
+
     def _parse_private_key(self, keyfile):
         # try all versions of encryption keys
         pkey = None
@@ -130,12 +150,13 @@ class SshClient:
         """
         Executes ssh command with timeout defined in SSH_COMMAND_TIMEOUT
         """
+        transport = self.ssh.get_transport()
         try:
             _, stdout, stderr = self._execute_ssh_command(curl)
         except paramiko.ssh_exception.SSHException:
             try:
                 logging.info("Failed to execute SSH command, resetting connection and trying again...")
-                self.connect_ssh()
+                self.reconnect_ssh(transport)
                 _, stdout, stderr = self._execute_ssh_command(curl)
             except paramiko.ssh_exception.SSHException:
                 logging.exception(f"Maximum number of retries (3) reached when executing ssh_command {curl}")
@@ -157,12 +178,10 @@ class SshClient:
 
         logging.info(f"Default size: {self._default_size}")
 
-        curl = self.build_curl(db_url, "POST", [("Content-Type", "application/json")], body)
+        curl = self.build_curl(db_url, "POST", self.get_headers(), body)
 
         _, stdout, stderr = self.execute_ssh_command(curl)
-        out, err = stdout.read(), stderr.read()
-
-        return out.decode().strip(), err.decode().strip()
+        return stdout, stderr
 
     def get_scroll(self, scroll_id):
         db_url = furl(f"{self.db.host}:{self.db.port}")
@@ -170,9 +189,7 @@ class SshClient:
 
         data = {"scroll": self._default_scroll, "scroll_id": scroll_id}
 
-        curl = self.build_curl(db_url, "POST", [("Content-Type", "application/json")], data)
+        curl = self.build_curl(db_url, "POST", self.get_headers(), data)
 
         _, stdout, stderr = self.execute_ssh_command(curl)
-        out, err = stdout.read(), stderr.read()
-
-        return out.decode().strip(), err.decode().strip()
+        return stdout, stderr
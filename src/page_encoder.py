@@ -0,0 +1,41 @@
+"""
+Flattening and CSV encoding of raw search result pages, run in a pool of worker processes.
+
+Flattening the documents, normalizing the column names and encoding the rows take most of the CPU time
+of an extraction of wide documents and, in a single process, cannot use more than one core. The raw page
+bodies are instead sent to worker processes, which return the rows of a page already encoded as CSV.
+"""
+
+from typing import Sequence
+
+from client.flattener import Flattener
+from client.projection import FieldProjection
+from client.search_page import SearchPage
+from table_writers import RowEncoder
+
+
+def encode_page(
+    body: bytes | dict,
+    columns: Sequence[str],
+    include_meta_fields: bool = False,
+    compact_json: bool = False,
+    projection: FieldProjection = None,
+) -> tuple[list[str], str]:
+    """
+    Flattens the hits of a page and encodes them as CSV rows (without a header).
+
+    Parameters:
+        body (bytes | dict): Raw body of the search response.
+        columns (Sequence[str]): Columns known so far, their positions in the encoded rows are kept.
+        include_meta_fields (bool): Merges the ES metadata fields into each row.
+        compact_json (bool): Encodes arrays as compact JSON.
+        projection (FieldProjection): Fields of the documents written to the rows.
+
+    Returns:
+        tuple[list[str], str]: Columns of the encoded rows (the known columns followed by the columns first seen
+            in this page) and the encoded rows.
+    """
+    flattener = Flattener(compact_json, projection)
+    encoder = RowEncoder(list(columns))
+    data = encoder.encode(flattener.process_page(SearchPage(body), include_meta_fields))
+    return encoder.columns, data
@@ -0,0 +1,229 @@
+import csv
+import io
+import os
+import shutil
+import tempfile
+from typing import Iterable
+
+from keboola.component.base import ComponentBase
+from keboola.component.dao import TableDefinition
+from keboola.csvwriter import ElasticDictWriter
+
+from column_normalizer import ColumnNormalizer
+
+_header_normalizer = ColumnNormalizer(forbidden_sub="_")
+
+# sparse documents have almost as many distinct key sequences as rows, so the cache of their positions is bounded
+MAX_CACHED_KEY_SEQUENCES = 1000
+
+
+class FixedColumnsWriter:
+    """
+    CSV writer for rows with a column list known upfront (e.g. SQL results), writing row arrays directly
+    without building a dictionary for every row.
+    """
+
+    def __init__(self, file_path: str, fieldnames: list[str]):
+        self.fieldnames = fieldnames
+        self._file = open(file_path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file, lineterminator="\n")
+        self._writer.writerow(fieldnames)
+
+    def writerows(self, rows) -> None:
+        self._writer.writerows(rows)
+
+    def writeheader(self) -> None:
+        # the header is written when the file is opened
+        pass
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class RowEncoder:
+    """
+    Encodes batches of flattened rows as CSV. The keys of the rows are normalized to column names and mapped
+    onto the column list, which is extended by the columns of new keys. Rows mostly share the same keys, so
+    the normalized names and positions are resolved once per distinct key sequence instead of for every row.
+    """
+
+    def __init__(self, columns: list[str]):
+        self.columns = columns
+        self._positions: dict[tuple, list[int]] = {}
+        self._column_positions = {column: position for position, column in enumerate(columns)}
+
+    def encode(self, rows: Iterable[dict]) -> str:
+        """
+        Returns the rows encoded as CSV (without a header), all with the number of columns after the batch.
+        """
+        width = len(self.columns)
+        encoded = []
+        for row in rows:
+            keys = tuple(row.keys())
+            positions = self._positions.get(keys)
+            if positions is None:
+                if len(self._positions) >= MAX_CACHED_KEY_SEQUENCES:
+                    self._positions.clear()
+                positions = self._positions[keys] = self._resolve_positions(keys)
+                width = len(self.columns)
+            values = [""] * width
+            for position, value in zip(positions, row.values()):
+                values[position] = value
+            encoded.append(values)
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        for values in encoded:
+            if len(values) < width:
+                # rows encoded before a new column appeared in the batch are shorter
+                values.extend([""] * (width - len(values)))
+        writer.writerows(encoded)
+        return buffer.getvalue()
+
+    def _resolve_positions(self, keys: tuple) -> list[int]:
+        positions = []
+        for column in _header_normalizer.normalize_header([key.lstrip("_") for key in keys]):
+            position = self._column_positions.get(column)
+            if position is None:
+                position = self._column_positions[column] = len(self.columns)
+                self.columns.append(column)
+            positions.append(position)
+        return positions
+
+
+class EncodedChunksWriter:
+    """
+    CSV writer for chunks of rows encoded elsewhere (e.g. by `page_encoder` in worker processes), appended
+    in the order they are written. Each chunk comes with the columns it was encoded with. Rows of chunks encoded
+    before all the columns were known are padded with empty values when the writer is closed.
+    """
+
+    def __init__(self, file_path: str, fieldnames: list[str]):
+        self.fieldnames = list(fieldnames)
+        self._file_path = file_path
+        self._write_header = False
+        self._body = tempfile.TemporaryFile(dir=os.path.dirname(file_path))
+        # consecutive ranges of the body with the same number of columns: [columns, start, end]
+        self._segments: list[list[int]] = []
+
+    def write_chunk(self, columns: list[str], data: str) -> None:
+        known = set(self.fieldnames)
+        self.fieldnames.extend(column for column in columns if column not in known)
+        if self.fieldnames[: len(columns)] != columns:
+            # the chunk knows columns added by other chunks in a different order
+            data = self._reorder(columns, data)
+            columns = self.fieldnames
+        if not data:
+            return
+
+        start = self._body.tell()
+        self._body.write(data.encode("utf-8"))
+        end = self._body.tell()
+        if self._segments and self._segments[-1][0] == len(columns):
+            self._segments[-1][2] = end
+        else:
+            self._segments.append([len(columns), start, end])
+
+    def _reorder(self, columns: list[str], data: str) -> str:
+        positions = [self.fieldnames.index(column) for column in columns]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        for values in csv.reader(io.StringIO(data)):
+            row = [""] * len(self.fieldnames)
+            for position, value in zip(positions, values):
+                row[position] = value
+            writer.writerow(row)
+        return buffer.getvalue()
+
+    def writeheader(self) -> None:
+        self._write_header = True
+
+    def close(self) -> None:
+        with open(self._file_path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file, lineterminator="\n")
+            if self._write_header:
+                writer.writerow(self.fieldnames)
+            file.flush()
+            for width, start, end in self._segments:
+                if width == len(self.fieldnames):
+                    self._body.seek(start)
+                    shutil.copyfileobj(_BoundedReader(self._body, end - start), file.buffer)
+                else:
+                    padding = [""] * (len(self.fieldnames) - width)
+                    writer.writerows(values + padding for values in csv.reader(self._read_lines(start, end)))
+                    file.flush()
+        self._body.close()
+
+    def _read_lines(self, start: int, end: int) -> Iterable[str]:
+        self._body.seek(start)
+        while self._body.tell() < end:
+            yield self._body.readline().decode("utf-8")
+
+
+class _BoundedReader:
+    def __init__(self, file, size: int):
+        self._file = file
+        self._remaining = size
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+
+class TableWriters:
+    """
+    Output tables written during a single extraction. Each table gets its own ElasticDictWriter, opened on first
+    use with the column list stored in the state file, so that the column order stays stable across runs.
+    """
+
+    def __init__(self, component: ComponentBase, statefile: dict, incremental: bool = False):
+        self._component = component
+        self._statefile = statefile
+        self._incremental = incremental
+        self._tables: dict[
+            str, tuple[TableDefinition, ElasticDictWriter | FixedColumnsWriter | EncodedChunksWriter]
+        ] = {}
+
+    def get(self, table_name: str, primary_key: list[str] = None) -> ElasticDictWriter:
+        if table_name not in self._tables:
+            table = self._create_table(table_name, primary_key)
+            columns = self._statefile.get(table_name, [])
+            self._tables[table_name] = (table, ElasticDictWriter(table.full_path, columns))
+        return self._tables[table_name][1]
+
+    def get_fixed(self, table_name: str, columns: list[str], primary_key: list[str] = None) -> FixedColumnsWriter:
+        if table_name not in self._tables:
+            table = self._create_table(table_name, primary_key)
+            self._tables[table_name] = (table, FixedColumnsWriter(table.full_path, columns))
+        return self._tables[table_name][1]
+
+    def get_encoded(self, table_name: str, primary_key: list[str] = None) -> EncodedChunksWriter:
+        if table_name not in self._tables:
+            table = self._create_table(table_name, primary_key)
+            columns = self._statefile.get(table_name, [])
+            self._tables[table_name] = (table, EncodedChunksWriter(table.full_path, columns))
+        return self._tables[table_name][1]
+
+    def _create_table(self, table_name: str, primary_key: list[str] = None) -> TableDefinition:
+        return self._component.create_out_table_definition(
+            table_name,
+            primary_key=primary_key or [],
+            incremental=self._incremental,
+        )
+
+    def close(self) -> None:
+        """
+        Closes all writers, writes the manifests and stores the final column lists in the state file.
+        """
+        for table_name, (table, writer) in self._tables.items():
+            writer.writeheader()
+            writer.close()
+            self._component.write_manifest(table)
+            self._statefile[table_name] = writer.fieldnames
+
+    def abort(self) -> None:
+        for _, writer in self._tables.values():
+            writer.close()
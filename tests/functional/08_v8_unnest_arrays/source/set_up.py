@@ -0,0 +1,19 @@
+from keboola.datadirtest import TestDataDir
+from elasticsearch import Elasticsearch
+
+
+def run(context: TestDataDir):
+    es = Elasticsearch("http://elasticsearch8:9200")
+
+    if es.indices.exists(index="test-orders"):
+        es.indices.delete(index="test-orders")
+
+    documents = [
+        {"order_id": 1, "customer": "Adam", "lines": [{"sku": "A1", "qty": 2}, {"sku": "B2", "qty": 1}]},
+        {"order_id": 2, "customer": "Božena", "lines": [{"sku": "C3", "qty": 5}]},
+    ]
+
+    for doc in documents:
+        es.index(index="test-orders", id=doc["order_id"], document=doc)
+
+    es.indices.refresh(index="test-orders")
@@ -0,0 +1,20 @@
+from keboola.datadirtest import TestDataDir
+from elasticsearch import Elasticsearch
+
+
+def run(context: TestDataDir):
+    es = Elasticsearch("http://elasticsearch8:9200")
+
+    if es.indices.exists(index="test-sales"):
+        es.indices.delete(index="test-sales")
+
+    documents = [
+        {"sale_id": 1, "category": "fruit", "price": 1},
+        {"sale_id": 2, "category": "fruit", "price": 2},
+        {"sale_id": 3, "category": "vegetable", "price": 4},
+    ]
+
+    for doc in documents:
+        es.index(index="test-sales", id=doc["sale_id"], document=doc)
+
+    es.indices.refresh(index="test-sales")
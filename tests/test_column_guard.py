@@ -0,0 +1,45 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+import unittest
+
+from client.column_guard import KeyCardinalityGuard
+from client.flattener import Flattener
+from component import STATE_COLLAPSED_PATHS, Component
+from configuration import Configuration
+
+
+def document(i: int) -> dict:
+    return {"id": i, "attrs": {f"k{i}": i}, "customer": {"name": "A"}}
+
+
+class TestKeyCardinalityGuard(unittest.TestCase):
+    def test_object_with_growing_keys_is_collapsed_to_json(self):
+        flattener = Flattener(guard=KeyCardinalityGuard(max_keys=2))
+
+        rows = [flattener.flatten_source(document(i)) for i in range(4)]
+
+        self.assertEqual(rows[1], {"id": 1, "attrs.k1": 1, "customer.name": "A"})
+        self.assertEqual(rows[2], {"id": 2, "attrs": '{"k2": 2}', "customer.name": "A"})
+        self.assertEqual(rows[3], {"id": 3, "attrs": '{"k3": 3}', "customer.name": "A"})
+        self.assertEqual(flattener.guard.collapsed, {"attrs"})
+
+    def test_paths_collapsed_in_previous_runs_are_kept_as_objects(self):
+        flattener = Flattener(guard=KeyCardinalityGuard(collapsed=["attrs"], keep_objects=True))
+
+        self.assertEqual(flattener.flatten_source(document(0)), {"id": 0, "attrs": {"k0": 0}, "customer.name": "A"})
+
+    def test_collapsed_paths_are_saved_without_their_columns(self):
+        config = Configuration(db={"hostname": "localhost", "port": 9200}, storage_table="out")
+        statefile = {"out": ["id", "attrs_k0", "attrs_k1", "attrs", "attrs_extra_id", "customer_name"]}
+        guard = KeyCardinalityGuard(collapsed=["attrs.extra", "attrs"])
+
+        Component._save_collapsed_paths(config, statefile, guard)
+
+        self.assertEqual(statefile["out"], ["id", "attrs", "customer_name"])
+        self.assertEqual(statefile[STATE_COLLAPSED_PATHS], ["attrs", "attrs.extra"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -3,7 +3,11 @@ import mock
 import os
 from freezegun import freeze_time
 
+from client.flattener import Flattener
+from client.search_page import SearchPage
 from component import Component
+from configuration import Configuration
+from keboola.component.exceptions import UserException
 
 
 class TestComponent(unittest.TestCase):
@@ -16,6 +20,132 @@ class TestComponent(unittest.TestCase):
             comp = Component()
             comp.run()
 
+    @freeze_time("2010-10-10 12:00:00")
+    def test_date_range_expansion(self):
+        # the date placeholder replacement does not need the data folder
+        comp = Component.__new__(Component)
+        config = Configuration(
+            db={"hostname": "localhost", "port": 9200},
+            index_name="logs-{{date}}",
+            date={"shift": "3 days ago", "end_shift": "yesterday", "format": "%Y.%m.%d"},
+        )
+        index, _ = comp.parse_index_parameters(config)
+        self.assertEqual(index, ["logs-2010.10.07", "logs-2010.10.08", "logs-2010.10.09"])
+
+        config.date.format = "%Y-%m"
+        self.assertEqual(comp.parse_index_parameters(config)[0], ["logs-2010-10"])
+
+        config.date.end_shift = "4 days ago"
+        with self.assertRaises(UserException):
+            comp.parse_index_parameters(config)
+
+    def test_preview_shows_sampled_rows_and_inferred_columns(self):
+        comp = Component.__new__(Component)
+        configuration = mock.Mock(
+            action="run", parameters={"db": {"hostname": "localhost", "port": 9200}, "index_name": "orders"}
+        )
+        client = mock.Mock()
+        client.sample_data.return_value = [{"id": 1, "a.b": "x|y"}, {"id": 2, "note": "two\nlines"}]
+
+        with (
+            mock.patch.object(Component, "configuration", configuration),
+            mock.patch.object(Component, "_connect", return_value=client),
+        ):
+            result = comp.preview()
+
+        client.sample_data.assert_called_once_with("orders", {}, 100, include_meta_fields=False)
+        self.assertEqual(
+            result.message.splitlines(),
+            [
+                "Columns inferred from 2 sampled documents: id, a_b, note",
+                "",
+                "| id | a_b | note |",
+                "|---|---|---|",
+                "| 1 | x\\|y |  |",
+                "| 2 |  | two lines |",
+            ],
+        )
+
+    def test_preview_of_date_range_samples_only_existing_indices(self):
+        comp = Component.__new__(Component)
+        parameters = {
+            "db": {"hostname": "localhost", "port": 9200},
+            "index_name": "logs-{{date}}",
+            "date": {"shift": "2024-01-01", "end_shift": "2024-01-03", "format": "%Y.%m.%d"},
+        }
+        client = mock.Mock()
+        client.resolve_non_empty_indices.side_effect = [["logs-2024.01.02"], []]
+        client.sample_data.return_value = [{"id": 1}]
+
+        with (
+            mock.patch.object(Component, "configuration", mock.Mock(action="run", parameters=parameters)),
+            mock.patch.object(Component, "_connect", return_value=client),
+        ):
+            result = comp.preview()
+            empty_result = comp.preview()
+
+        client.resolve_non_empty_indices.assert_called_with(
+            ["logs-2024.01.01", "logs-2024.01.02", "logs-2024.01.03"], {}
+        )
+        client.sample_data.assert_called_once_with(["logs-2024.01.02"], {}, 100, include_meta_fields=False)
+        self.assertIn("| 1 |", result.message)
+        self.assertEqual(empty_result.message, "No documents match the query.")
+
+    def test_rows_are_routed_to_tables_by_index(self):
+        comp = Component.__new__(Component)
+        config = Configuration(
+            db={"hostname": "localhost", "port": 9200},
+            storage_table="logs",
+            table_routing={"field": "_index", "tables": [{"value": "logs-app", "table": "app"}]},
+        )
+        tables = {}
+        writers = mock.Mock()
+        writers.get_encoded.side_effect = lambda name, primary_key: tables.setdefault(name, mock.Mock(fieldnames=[]))
+        rows = [{"_index": "logs-app", "id": 1}, {"_index": "logs-db", "id": 2}, {"id": 3}, {"_index": "logs-app", "id": 4}]
+
+        comp._write_rows(writers, mock.Mock(guard=None), config, rows)
+
+        self.assertEqual(sorted(tables), ["app", "logs", "logs_logs_db"])
+        tables["app"].write_chunk.assert_called_once_with(["id"], "1\n4\n")
+        tables["logs_logs_db"].write_chunk.assert_called_once_with(["id"], "2\n")
+
+    def test_routed_rows_keep_the_parent_id_of_unnested_arrays(self):
+        comp = Component.__new__(Component)
+        config = Configuration(
+            db={"hostname": "localhost", "port": 9200},
+            storage_table="logs",
+            unnest_arrays=["lines"],
+            table_routing={"field": "_index"},
+        )
+        flattener = Flattener()
+        flattener.meta_fields = Component._get_routing_meta_fields(config)
+        hits = [{"_id": str(i), "_index": "logs-app", "_source": {"lines": [{"sku": i}]}} for i in range(2)]
+        tables = {}
+        writers = mock.Mock()
+        writers.get_encoded.side_effect = lambda name, primary_key: tables.setdefault(name, mock.Mock(fieldnames=[]))
+        writers.get.side_effect = lambda name, primary_key: tables.setdefault(name, mock.Mock())
+
+        rows = flattener.process_page(SearchPage({"hits": {"hits": hits}}), keep_lists=config.unnest_arrays)
+        comp._write_rows(writers, flattener, config, rows)
+
+        tables["logs_logs_app"].write_chunk.assert_called_once_with(["id"], "0\n1\n")
+        self.assertEqual(
+            [c.args[0] for c in tables["logs_logs_app_lines"].writerow.call_args_list],
+            [{"parent_id": "0", "array_index": 0, "sku": 0}, {"parent_id": "1", "array_index": 0, "sku": 1}],
+        )
+
+    def test_query_of_shard_routing_is_optimized_for_scrolls(self):
+        config = Configuration(
+            db={"hostname": "localhost", "port": 9200},
+            pagination="point_in_time",
+            parallelism="shards",
+            async_search=True,
+        )
+
+        body = Component._optimize_query(config, {"query": {"match_all": {}}})
+
+        # neither the _shard_doc sort nor disabled total hits are accepted by scrolls
+        self.assertEqual(body, {"query": {"match_all": {}}, "sort": ["_doc"]})
 
 if __name__ == "__main__":
     # import sys;sys.argv = ['', 'Test.testName']
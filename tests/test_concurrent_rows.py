@@ -0,0 +1,36 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+import itertools
+import unittest
+
+from concurrent_rows import iter_concurrently
+
+
+def source(start: int, count: int):
+    return lambda: ({"id": i} for i in range(start, start + count))
+
+
+class TestConcurrentRows(unittest.TestCase):
+    def test_rows_of_all_sources_are_yielded(self):
+        sources = [source(0, 7), source(100, 0), source(200, 3), source(300, 12)]
+
+        rows = list(iter_concurrently(sources, concurrency=2, batch_size=5, queue_batches=1))
+
+        self.assertEqual(sorted(row["id"] for row in rows), [*range(7), *range(200, 203), *range(300, 312)])
+
+    def test_error_of_a_source_is_raised(self):
+        def failing():
+            yield {"id": -1}
+            raise SystemExit(1)
+
+        def endless():
+            return ({"id": i} for i in itertools.count())
+
+        with self.assertRaises(SystemExit):
+            list(iter_concurrently([endless, failing], concurrency=2, batch_size=10, queue_batches=1))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+import unittest
+from datetime import datetime
+
+import mock
+from freezegun import freeze_time
+
+from date_shift import resolve_date_shift
+
+
+class TestDateShift(unittest.TestCase):
+    @freeze_time("2024-03-10 12:30:00")
+    def test_common_shifts(self):
+        self.assertEqual(resolve_date_shift("today"), datetime(2024, 3, 10, 12, 30))
+        self.assertEqual(resolve_date_shift(" Yesterday "), datetime(2024, 3, 9, 12, 30))
+        self.assertEqual(resolve_date_shift("3 days ago"), datetime(2024, 3, 7, 12, 30))
+        self.assertEqual(resolve_date_shift("a week ago"), datetime(2024, 3, 3, 12, 30))
+        self.assertEqual(resolve_date_shift("2 hours ago"), datetime(2024, 3, 10, 10, 30))
+        self.assertEqual(resolve_date_shift("2024-01-31"), datetime(2024, 1, 31))
+
+    def test_iso_datetimes_are_resolved_without_dateparser(self):
+        # importing a module set to None raises an ImportError
+        with mock.patch.dict(sys.modules, {"dateparser": None}):
+            self.assertEqual(resolve_date_shift("2024-01-31T10:00"), datetime(2024, 1, 31, 10))
+            self.assertEqual(resolve_date_shift("2024-01-31 10:00:05.5"), datetime(2024, 1, 31, 10, 0, 5, 500000))
+
+    @freeze_time("2024-03-10 12:30:00")
+    def test_fallback_to_dateparser(self):
+        self.assertEqual(resolve_date_shift("1 month ago").date(), datetime(2024, 2, 10).date())
+        self.assertIsNone(resolve_date_shift("not a date at all"))
+
+
+if __name__ == "__main__":
+    unittest.main()
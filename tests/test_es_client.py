@@ -0,0 +1,405 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+import json
+import unittest
+
+import mock
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig
+from elasticsearch import ApiError, NotFoundError
+
+from client.es_client import ElasticsearchClient, ElasticsearchClientException
+from client.search_page import SearchPage, SearchPageSerializer, raw_responses
+from client.throttle import AdaptiveThrottle
+
+
+def api_error(error_class, status: int):
+    meta = ApiResponseMeta(status, "1.1", HttpHeaders(), 0.0, NodeConfig("http", "localhost", 9200))
+    return error_class(f"error {status}", meta, {})
+
+
+def build_page(ids: list[int]) -> dict:
+    hits = [{"_id": str(i), "_source": {"id": i}, "sort": [i]} for i in ids]
+    return {"pit_id": "pit", "_scroll_id": "scroll", "hits": {"total": {"value": 5}, "hits": hits}}
+
+
+@mock.patch("client.es_client.time.sleep", lambda _: None)
+class TestElasticsearchClient(unittest.TestCase):
+    def setUp(self):
+        self.client = ElasticsearchClient(["http://localhost:9200"], page_retries=2)
+
+    def test_point_in_time_pages_are_retried_and_recovered(self):
+        responses = iter(
+            [
+                build_page([0, 1]),
+                api_error(ApiError, 503),
+                api_error(NotFoundError, 404),
+                build_page([2, 3]),
+                build_page([]),
+            ]
+        )
+        requested_after = []
+
+        def search(self, body):
+            requested_after.append(body.get("search_after"))
+            response = next(responses)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        with (
+            mock.patch.object(ElasticsearchClient, "search", search),
+            mock.patch.object(ElasticsearchClient, "open_point_in_time", return_value={"id": "pit"}) as open_pit,
+            mock.patch.object(ElasticsearchClient, "close_point_in_time") as close_pit,
+        ):
+            rows = list(self.client.extract_data("index", {}, pagination="point_in_time"))
+
+        self.assertEqual([row["id"] for row in rows], [0, 1, 2, 3])
+        self.assertEqual(self.client.retried_pages, 1)
+        self.assertEqual(self.client.recovered_contexts, 1)
+        self.assertEqual(open_pit.call_count, 2)
+        close_pit.assert_called_once()
+        # the retried and recovered requests continue after the last downloaded document
+        self.assertEqual(requested_after, [None, [1], [1], [1], [3]])
+
+    def test_statuses_are_retried_only_by_the_client(self):
+        perform_request = mock.Mock(side_effect=api_error(ApiError, 429))
+        with mock.patch.object(self.client.transport, "perform_request", perform_request):
+            with self.assertRaises(ApiError):
+                self.client.info()
+
+        # retries of the transport would resend a rejected request at once, bypassing the backoff and the throttle
+        self.assertEqual(perform_request.call_args.kwargs["retry_on_status"], ())
+
+    def test_non_retriable_error_is_raised(self):
+        search = mock.Mock(side_effect=api_error(ApiError, 400))
+        with mock.patch.object(ElasticsearchClient, "search", search):
+            with self.assertRaises(ApiError):
+                list(self.client.extract_data("index", {}))
+        search.assert_called_once()
+
+    def test_expired_scroll_without_sort_fails(self):
+        page = build_page([0, 1])
+        for hit in page["hits"]["hits"]:
+            del hit["sort"]
+        with (
+            mock.patch.object(ElasticsearchClient, "search", return_value=page),
+            mock.patch.object(ElasticsearchClient, "scroll", side_effect=api_error(NotFoundError, 404)),
+        ):
+            with self.assertRaises(ElasticsearchClientException):
+                list(self.client.extract_data("index", {}))
+
+    def test_expired_scroll_is_resumed_only_after_a_unique_sort(self):
+        for query, recovered in (
+            ({"sort": [{"timestamp": "asc"}]}, False),
+            ({"sort": [{"timestamp": "asc"}, {"_id": "asc"}]}, True),
+            ({"sort": ["_seq_no"]}, False),
+            ({"sort": ["_id"], "slice": {"id": 0, "max": 2}}, False),
+        ):
+            with self.subTest(query=query):
+                search = mock.Mock(side_effect=[build_page([0, 1]), build_page([2]), build_page([])])
+                with (
+                    mock.patch.object(ElasticsearchClient, "search", search),
+                    mock.patch.object(ElasticsearchClient, "scroll", side_effect=api_error(NotFoundError, 404)),
+                ):
+                    if recovered:
+                        rows = list(self.client.extract_data("index", query))
+                        self.assertEqual([row["id"] for row in rows], [0, 1, 2])
+                        self.assertEqual(self.client.recovered_contexts, 1)
+                    else:
+                        with self.assertRaises(ElasticsearchClientException):
+                            list(self.client.extract_data("index", query))
+
+    def test_throttled_extraction_downloads_all_slices(self):
+        self.client.throttle = AdaptiveThrottle(max_concurrency=3, max_page_size=2, min_page_size=1)
+        requested_sizes = []
+
+        def search(self, body):
+            slice_id = body["slice"]["id"]
+            requested_sizes.append(body["size"])
+            after = body.get("search_after", [-1])[0]
+            ids = [i for i in range(slice_id * 10, slice_id * 10 + 5) if i > after][: body["size"]]
+            return {"took": 5000 if slice_id == 2 else 1, **build_page(ids)}
+
+        with (
+            mock.patch.object(ElasticsearchClient, "search", search),
+            mock.patch.object(ElasticsearchClient, "open_point_in_time", return_value={"id": "pit"}),
+            mock.patch.object(ElasticsearchClient, "close_point_in_time"),
+        ):
+            rows = list(self.client.extract_data("index", {}, pagination="point_in_time"))
+
+        self.assertEqual(sorted(row["id"] for row in rows), [0, 1, 2, 3, 4, 10, 11, 12, 13, 14, 20, 21, 22, 23, 24])
+        # the slow slice reduces the page size of the following requests
+        self.assertIn(1, requested_sizes)
+
+    def test_shards_are_extracted_from_replicas(self):
+        def shard_copy(shard: int, node: str, primary: bool, state: str = "STARTED") -> dict:
+            return {"index": "orders", "shard": shard, "node": node, "primary": primary, "state": state}
+
+        search_shards = {
+            "shards": [
+                [shard_copy(0, "n1", True), shard_copy(0, "n2", False)],
+                [shard_copy(1, "n2", True), shard_copy(1, "n3", False), shard_copy(1, "n1", False)],
+                [shard_copy(2, "n3", True), shard_copy(2, "n1", False, state="INITIALIZING")],
+            ]
+        }
+        self.client.shard_routing = True
+        searches = []
+
+        def search(self, index, size, scroll, body, preference):
+            searches.append(preference)
+            shard = int(preference.split("|")[0].split(":")[1])
+            return {**build_page([shard * 10, shard * 10 + 1]), "_scroll_id": str(shard)}
+
+        with (
+            mock.patch.object(ElasticsearchClient, "search_shards", return_value=search_shards),
+            mock.patch.object(ElasticsearchClient, "search", search),
+            mock.patch.object(ElasticsearchClient, "scroll", return_value=build_page([])),
+        ):
+            rows = list(self.client.extract_data("orders", {}))
+
+        self.assertEqual(sorted(row["id"] for row in rows), [0, 1, 10, 11, 20, 21])
+        # replicas on the least used nodes, the primary only where no replica is started
+        self.assertEqual(
+            sorted(searches),
+            ["_shards:0|_prefer_nodes:n2", "_shards:1|_prefer_nodes:n3", "_shards:2|_prefer_nodes:n3"],
+        )
+
+    def test_relocating_shards_are_extracted_and_unassigned_shards_fail(self):
+        def shard_copy(shard: int, node: str, state: str) -> dict:
+            return {"index": "orders", "shard": shard, "node": node, "primary": True, "state": state}
+
+        relocating = [shard_copy(0, "n1", "RELOCATING"), {**shard_copy(0, "n2", "INITIALIZING"), "primary": False}]
+        with mock.patch.object(ElasticsearchClient, "search_shards", return_value={"shards": [relocating]}):
+            self.assertEqual(self.client.get_shard_preferences("orders"), [("orders", "_shards:0|_prefer_nodes:n1")])
+
+        unassigned = [[shard_copy(0, "n1", "STARTED")], [shard_copy(1, None, "UNASSIGNED")]]
+        with mock.patch.object(ElasticsearchClient, "search_shards", return_value={"shards": unassigned}):
+            with self.assertRaisesRegex(ElasticsearchClientException, "Shard 1 of index orders has no active copy"):
+                self.client.get_shard_preferences("orders")
+
+    def test_async_search_is_polled_instead_of_resubmitted(self):
+        self.client.use_async_search = True
+        async_search = mock.Mock()
+        async_search.submit.side_effect = [
+            {"id": "a1", "is_running": True, "is_partial": True, "response": build_page([])},
+            {"is_running": False, "is_partial": False, "response": build_page([])},
+        ]
+        async_search.get.side_effect = [
+            {"id": "a1", "is_running": True, "is_partial": True, "response": build_page([])},
+            {"id": "a1", "is_running": False, "is_partial": False, "response": build_page([0, 1])},
+        ]
+
+        with (
+            mock.patch.object(self.client, "async_search", async_search),
+            mock.patch.object(ElasticsearchClient, "open_point_in_time", return_value={"id": "pit"}),
+            mock.patch.object(ElasticsearchClient, "close_point_in_time"),
+        ):
+            # async searches page through a point in time, even with the scroll pagination
+            rows = list(self.client.extract_data("index", {"query": {"term": {"a": 1}}}))
+
+        self.assertEqual([row["id"] for row in rows], [0, 1])
+        self.assertEqual(async_search.submit.call_count, 2)
+        self.assertEqual(async_search.submit.call_args.kwargs["body"]["search_after"], [1])
+        self.assertEqual(async_search.get.call_count, 2)
+        async_search.delete.assert_called_once_with(id="a1")
+
+    def test_resolve_non_empty_indices(self):
+        resolved = {
+            "indices": [{"name": "logs-1"}, {"name": "logs-3"}],
+            "aliases": [],
+            "data_streams": [{"name": "logs-4"}],
+        }
+        counts = {"logs-1": 10, "logs-3": 0, "logs-4": 2}
+        with (
+            mock.patch.object(self.client.indices, "resolve_index", return_value=resolved) as resolve_index,
+            mock.patch.object(ElasticsearchClient, "count", lambda _, index, query: {"count": counts[index]}),
+        ):
+            indices = self.client.resolve_non_empty_indices(["logs-1", "logs-2", "logs-3", "logs-4"], {})
+
+        self.assertEqual(indices, ["logs-1", "logs-4"])
+        resolve_index.assert_called_once_with(
+            name="logs-1,logs-2,logs-3,logs-4", ignore_unavailable=True, allow_no_indices=True
+        )
+
+    def test_indices_matched_together_with_their_alias_or_data_stream_are_resolved_once(self):
+        resolved = {
+            "indices": [
+                {"name": "logs-app-1", "aliases": ["logs-all-1"]},
+                {"name": "logs-db-1", "aliases": ["logs-all-1"]},
+                {"name": ".ds-logs-web-1-000001", "data_stream": "logs-web-1"},
+            ],
+            "aliases": [
+                {"name": "logs-all-1", "indices": ["logs-app-1", "logs-db-1", "logs-old-1"]},
+                {"name": "logs-archive-1", "indices": ["archive-1"]},
+            ],
+            "data_streams": [{"name": "logs-web-1", "backing_indices": [".ds-logs-web-1-000001"]}],
+        }
+        with (
+            mock.patch.object(self.client.indices, "resolve_index", return_value=resolved),
+            mock.patch.object(ElasticsearchClient, "count", return_value={"count": 1}),
+        ):
+            indices = self.client.resolve_non_empty_indices(["logs-*-1", ".ds-logs-*"], {})
+
+        self.assertEqual(indices, ["logs-app-1", "logs-db-1", "logs-web-1", "logs-old-1", "logs-archive-1"])
+
+    def test_multiple_indices_are_extracted(self):
+        def search(self, index, size, scroll, body):
+            ids = [int(index[-1]) * 10 + i for i in range(3)]
+            return {**build_page(ids), "_scroll_id": index}
+
+        with (
+            mock.patch.object(ElasticsearchClient, "search", search),
+            mock.patch.object(ElasticsearchClient, "scroll", return_value=build_page([])),
+        ):
+            rows = list(self.client.extract_data(["logs-1", "logs-2", "logs-3"], {}))
+
+        self.assertEqual(sorted(row["id"] for row in rows), [10, 11, 12, 20, 21, 22, 30, 31, 32])
+
+    def test_raw_page_is_decoded_incrementally(self):
+        response = build_page([0, 1, 2])
+        response["hits"]["hits"][1]["_source"] = {"id": 1, "nested": {"a": [1, 2.5]}, "text": "ž"}
+        raw = SearchPageSerializer().dumps(response)
+
+        serializer = SearchPageSerializer()
+        self.assertEqual(serializer.loads(raw), response)
+        with raw_responses():
+            self.assertEqual(serializer.loads(raw), raw)
+
+        streamed, decoded = SearchPage(raw), SearchPage(json.loads(raw))
+        rows = list(self.client.flattener.process_page(streamed))
+        self.assertEqual(rows, list(self.client.flattener.process_page(decoded)))
+        self.assertEqual(rows[1], {"id": 1, "nested.a": "[1, 2.5]", "text": "ž"})
+        self.assertEqual((streamed.hit_count, streamed.last_hit["_id"]), (3, "2"))
+        self.assertEqual(streamed.envelope["pit_id"], "pit")
+
+    def test_raw_page_flattened_elsewhere_is_only_skimmed(self):
+        response = build_page([0, 1, 2])
+        response["hits"]["hits"][2]["_source"]["sort"] = [9]
+        with_aggregations = {**build_page([0]), "aggregations": {"top": {"hits": {"hits": [{"sort": [8]}]}}}}
+        with_inner_hits = build_page([0, 1])
+        with_inner_hits["hits"]["hits"][1]["inner_hits"] = {"comments": {"hits": {"hits": [{"sort": [7]}]}}}
+        serializer = SearchPageSerializer()
+
+        for response, last_hit in (
+            (response, {"sort": [2]}),
+            (with_aggregations, with_aggregations["hits"]["hits"][0]),
+            (with_inner_hits, with_inner_hits["hits"]["hits"][1]),
+            (build_page([]), None),
+        ):
+            with self.subTest(last_hit=last_hit):
+                page = SearchPage(serializer.dumps(response))
+                page.consume()
+
+                self.assertEqual(page.has_hits, last_hit is not None)
+                self.assertEqual(page.hit_count, 0)
+                self.assertEqual(page.envelope["_scroll_id"], "scroll")
+                self.assertEqual(page.envelope["hits"]["total"], {"value": 5})
+                self.assertEqual(page.last_hit, last_hit)
+
+    def test_thread_pool_is_monitored_during_raw_page_requests(self):
+        self.client.throttle = AdaptiveThrottle(max_concurrency=1, max_page_size=2, min_page_size=1)
+        self.client.monitor_thread_pool = True
+        serializer = SearchPageSerializer()
+        stats = {"nodes": {"n1": {"thread_pool": {"search": {"queue": 9, "threads": 4, "rejected": 0}}}}}
+        nodes = mock.Mock(**{"stats.side_effect": lambda **_: serializer.loads(serializer.dumps(stats))})
+        pages = iter([build_page([0, 1]), build_page([])])
+
+        def request_page(self, **_):
+            return serializer.loads(serializer.dumps(next(pages)))
+
+        with (
+            mock.patch.object(self.client, "nodes", nodes),
+            mock.patch.object(ElasticsearchClient, "search", request_page),
+            mock.patch.object(ElasticsearchClient, "scroll", request_page),
+            mock.patch.object(self.client.throttle, "on_thread_pool_stats") as on_thread_pool_stats,
+        ):
+            # the first scroll request is the first request of the extraction, so it checks the thread pool
+            rows = list(self.client.extract_data("index", {}))
+
+        self.assertEqual([row["id"] for row in rows], [0, 1])
+        on_thread_pool_stats.assert_called_once_with(queue=9, threads=4, rejected=0)
+        self.assertTrue(self.client.monitor_thread_pool)
+
+    def test_changes_are_extracted_per_shard_since_checkpoint(self):
+        stats = {
+            "indices": {
+                "orders": {
+                    "uuid": "u1",
+                    "shards": {
+                        "0": [
+                            {"routing": {"primary": False}, "seq_no": {"global_checkpoint": 3}},
+                            {"routing": {"primary": True}, "seq_no": {"global_checkpoint": 4}},
+                        ],
+                        "1": [{"routing": {"primary": True}, "seq_no": {"global_checkpoint": 7}}],
+                    },
+                }
+            }
+        }
+        requests = []
+
+        def search(self, index, body, preference):
+            seq_no = body["query"]["bool"]["filter"][0]["range"]["_seq_no"]
+            requests.append((preference, seq_no, body["query"]["bool"].get("must")))
+            if "search_after" in body:
+                return build_page([])
+            page = build_page([seq_no["lte"]])
+            page["hits"]["hits"][0].update({"_seq_no": seq_no["lte"], "_primary_term": 1, "sort": [seq_no["lte"]]})
+            return page
+
+        with (
+            mock.patch.object(self.client.indices, "stats", return_value=stats),
+            mock.patch.object(ElasticsearchClient, "search", search),
+        ):
+            until = self.client.get_seq_no_checkpoints("orders")
+            since = {"orders": {"uuid": "u1", "shards": {"0": 2, "1": 7}}}
+            rows = list(self.client.extract_changes({"query": {"term": {"a": 1}}}, since, until))
+
+        self.assertEqual(until, {"orders": {"uuid": "u1", "shards": {"0": 4, "1": 7}}})
+        # shard 1 has no new operations and is not searched at all
+        self.assertEqual(requests[0], ("_shards:0", {"gt": 2, "lte": 4}, [{"term": {"a": 1}}]))
+        self.assertEqual(len(requests), 2)
+        self.assertEqual(rows, [{"_id": "4", "_seq_no": 4, "_primary_term": 1, "id": 4}])
+
+        # a re-created index is extracted completely
+        with mock.patch.object(ElasticsearchClient, "search", search):
+            list(self.client.extract_changes({}, {"orders": {"uuid": "old", "shards": {"0": 2}}}, until))
+        self.assertEqual(requests[2][1], {"gt": -1, "lte": 4})
+
+    def test_returned_sequence_numbers_are_stored_without_refresh(self):
+        until = {"orders": {"uuid": "u1", "shards": {"0": 9, "1": 7, "2": 5}}}
+        since = {"orders": {"uuid": "u1", "shards": {"0": 2, "1": 3, "2": 5}}}
+
+        def search(self, index, body, preference):
+            # only operations up to 6 were refreshed on shard 0, shard 1 has none
+            seq_nos = [6] if preference == "_shards:0" and "search_after" not in body else []
+            page = build_page(seq_nos)
+            for hit in page["hits"]["hits"]:
+                hit.update({"_seq_no": hit["sort"][0], "_primary_term": 1})
+            return page
+
+        with (
+            mock.patch("elasticsearch._sync.client.IndicesClient.refresh", side_effect=api_error(ApiError, 403)),
+            mock.patch.object(ElasticsearchClient, "search", search),
+        ):
+            self.assertFalse(self.client.refresh_indices("orders"))
+            returned = {}
+            rows = list(self.client.extract_changes({}, since, until, returned=returned))
+
+        self.assertEqual([row["_seq_no"] for row in rows], [6])
+        self.assertEqual(returned, {"orders": {"uuid": "u1", "shards": {"0": 6, "1": 3, "2": 5}}})
+
+    def test_sample_stops_early_on_every_shard(self):
+        query = {"query": {"term": {"status": "new"}}, "size": 10_000, "aggs": {"statuses": {}}}
+        with mock.patch.object(ElasticsearchClient, "search", return_value=build_page([1, 2])) as search:
+            rows = self.client.sample_data("index", query, 2)
+
+        self.assertEqual(rows, [{"id": 1}, {"id": 2}])
+        body = search.call_args.kwargs["body"]
+        self.assertEqual((body["size"], body["terminate_after"]), (2, 2))
+        self.assertNotIn("aggs", body)
+
+
+if __name__ == "__main__":
+    unittest.main()
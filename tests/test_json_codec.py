@@ -0,0 +1,26 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+import json
+import unittest
+
+import mock
+
+import json_codec
+
+
+class TestJsonCodec(unittest.TestCase):
+    VALUES = [[1, 2.5, "ž", None, True], [{"a": [1, {"b": "c"}]}], [2**70], []]
+
+    def test_compact_output_matches_standard_library(self):
+        for value in self.VALUES:
+            expected = json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+            self.assertEqual(json_codec.dumps_compact(value), expected)
+
+            with mock.patch.object(json_codec, "orjson", None):
+                self.assertEqual(json_codec.dumps_compact(value), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
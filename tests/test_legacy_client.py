@@ -0,0 +1,121 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+import io
+import json
+import threading
+import unittest
+
+import mock
+import paramiko
+from keboola.component.exceptions import UserException
+
+from legacy_client.legacy_es_client import LegacyClient
+from legacy_client.ssh_client import SshClient
+
+
+def curl_output(ids: list[int], scroll_id: str, status: str = "200 OK") -> tuple[io.BytesIO, io.BytesIO]:
+    body = {"_scroll_id": scroll_id, "hits": {"total": 5, "hits": [{"_id": str(i), "_source": {"id": i}} for i in ids]}}
+    response = f"HTTP/1.1 {status}\r\ncontent-type: application/json\r\n\r\n{json.dumps(body)}"
+    return io.BytesIO(response.encode()), io.BytesIO()
+
+
+class TestLegacyClient(unittest.TestCase):
+    def setUp(self):
+        self.legacy = LegacyClient.__new__(LegacyClient)
+        self.legacy.index = "orders"
+        self.legacy.index_params = {"query": {"match_all": {}}}
+        self.legacy.fetcher = mock.Mock(**{"flatten_json.side_effect": lambda hit: hit["_source"]})
+        self.legacy.client = mock.Mock(_default_size=2)
+
+    @staticmethod
+    def first_page(index: str, body: dict):
+        slice_id = body["slice"]["id"]
+        # slice n has n + 1 documents: a full page, followed by a scroll page
+        return curl_output(list(range(slice_id * 10, slice_id * 10 + min(slice_id + 1, 2))), str(slice_id))
+
+    @staticmethod
+    def scroll(scroll_id: str):
+        slice_id = int(scroll_id)
+        return curl_output(list(range(slice_id * 10 + 2, slice_id * 10 + slice_id + 1)), scroll_id)
+
+    def test_rows_of_all_slices_are_merged(self):
+        self.legacy.client.get_first_page.side_effect = self.first_page
+        self.legacy.client.get_scroll.side_effect = self.scroll
+
+        rows = list(self.legacy.iter_sliced_rows(3))
+
+        self.assertEqual(sorted(row["id"] for row in rows), [0, 10, 11, 20, 21, 22])
+        slices = sorted(call.args[1]["slice"]["id"] for call in self.legacy.client.get_first_page.call_args_list)
+        self.assertEqual(slices, [0, 1, 2])
+        self.assertNotIn("slice", self.legacy.index_params)
+
+    def test_error_of_a_slice_is_raised(self):
+        def scroll(scroll_id: str):
+            if scroll_id == "2":
+                return curl_output([], scroll_id, status="500 Internal Server Error")
+            return self.scroll(scroll_id)
+
+        self.legacy.client.get_first_page.side_effect = self.first_page
+        self.legacy.client.get_scroll.side_effect = scroll
+
+        with self.assertRaises(UserException):
+            list(self.legacy.iter_sliced_rows(3))
+
+    def test_exit_of_the_ssh_client_in_a_slice_is_raised(self):
+        self.legacy.client.get_first_page.side_effect = self.first_page
+        # execute_ssh_command exits once the retries of a command are exhausted
+        self.legacy.client.get_scroll.side_effect = SystemExit(1)
+
+        with self.assertRaises(SystemExit):
+            list(self.legacy.iter_sliced_rows(3))
+
+
+class TestSshClient(unittest.TestCase):
+    def setUp(self):
+        self.client = SshClient.__new__(SshClient)
+        self.client._connection_lock = threading.Lock()
+        self.client.ssh = mock.Mock()
+        self.failed_transport = mock.Mock(**{"is_active.return_value": False})
+
+    def test_failed_transport_is_reconnected(self):
+        self.client.ssh.get_transport.return_value = self.failed_transport
+
+        with mock.patch.object(SshClient, "connect_ssh") as connect_ssh:
+            self.client.reconnect_ssh(self.failed_transport)
+
+        connect_ssh.assert_called_once()
+
+    def test_reconnect_is_skipped_when_another_slice_replaced_the_transport(self):
+        replaced = mock.Mock(**{"is_active.return_value": True})
+        # the command fails on the failed transport, another slice reconnects before this one gets the lock
+        self.client.ssh.get_transport.side_effect = [self.failed_transport, replaced]
+        execute = mock.Mock(side_effect=[paramiko.ssh_exception.SSHException("closed"), (None, "out", "err")])
+
+        with (
+            mock.patch.object(SshClient, "connect_ssh") as connect_ssh,
+            mock.patch.object(self.client, "_execute_ssh_command", execute),
+        ):
+            result = self.client.execute_ssh_command("curl")
+
+        connect_ssh.assert_not_called()
+        self.assertEqual(result, (None, "out", "err"))
+
+    def test_command_failing_after_reconnect_exits(self):
+        self.client.ssh.get_transport.return_value = self.failed_transport
+        execute = mock.Mock(side_effect=paramiko.ssh_exception.SSHException("closed"))
+
+        with (
+            mock.patch.object(SshClient, "connect_ssh") as connect_ssh,
+            mock.patch.object(self.client, "_execute_ssh_command", execute),
+        ):
+            with self.assertRaises(SystemExit):
+                self.client.execute_ssh_command("curl")
+
+        connect_ssh.assert_called_once()
+        self.assertEqual(execute.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
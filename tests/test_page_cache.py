@@ -0,0 +1,63 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+import json
+import shutil
+import tempfile
+import unittest
+
+import mock
+
+from client.es_client import ElasticsearchClient
+from client.flattener import Flattener
+from client.page_cache import PageCache, read_pages
+
+
+def build_page(ids: list[int]) -> dict:
+    hits = [{"_id": str(i), "_index": "index", "_source": {"id": i, "tags": ["a", i]}} for i in ids]
+    return {"_scroll_id": "scroll", "hits": {"total": {"value": 3}, "hits": hits}}
+
+
+class TestPageCache(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.folder, "pages.ndjson.gz")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_pages_are_replayed_as_written(self):
+        cache = PageCache(self.file_path)
+        # a pretty printed response spans multiple lines
+        cache.write(json.dumps(build_page([0, 1]), indent=2).encode())
+        cache.write(build_page([2]))
+        cache.close()
+
+        flattener = Flattener()
+        rows = [row for page in read_pages(self.file_path) for row in flattener.process_page(page, True)]
+
+        self.assertEqual(cache.pages, 2)
+        self.assertEqual([row["_id"] for row in rows], ["0", "1", "2"])
+        self.assertEqual(rows[2], {"_id": "2", "_index": "index", "id": 2, "tags": '["a", 2]'})
+
+    def test_client_caches_requested_pages(self):
+        client = ElasticsearchClient(["http://localhost:9200"], page_cache=PageCache(self.file_path))
+        responses = iter([build_page([0, 1]), build_page([2]), build_page([])])
+
+        with (
+            mock.patch.object(ElasticsearchClient, "search", lambda self, **kwargs: next(responses)),
+            mock.patch.object(ElasticsearchClient, "scroll", lambda self, **kwargs: next(responses)),
+            mock.patch.object(ElasticsearchClient, "clear_scroll"),
+        ):
+            extracted = list(client.extract_data("index", {}))
+        client.page_cache.close()
+
+        flattener = Flattener()
+        replayed = [row for page in read_pages(self.file_path) for row in flattener.process_page(page)]
+        self.assertEqual(replayed, extracted)
+        self.assertEqual(client.page_cache.pages, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+import json
+import shutil
+import tempfile
+import unittest
+
+from page_encoder import encode_page
+from table_writers import MAX_CACHED_KEY_SEQUENCES, EncodedChunksWriter, RowEncoder
+
+
+def build_page(sources: list[dict]) -> bytes:
+    hits = [{"_id": str(i), "_index": "index", "_source": source} for i, source in enumerate(sources)]
+    return json.dumps({"_scroll_id": "scroll", "hits": {"hits": hits}}).encode()
+
+
+class TestPageEncoder(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.file_path = os.path.join(self.folder, "table.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_page_is_encoded_with_known_columns_first(self):
+        page = build_page([{"a": {"b": 1}}, {"c": "multi\nline", "a": {"b": 2}, "d": [1, 2]}])
+
+        columns, data = encode_page(page, ("c", "a_b"))
+
+        self.assertEqual(columns, ["c", "a_b", "d"])
+        self.assertEqual(data, ',1,\n"multi\nline",2,"[1, 2]"\n')
+
+    def test_chunks_are_padded_and_reordered(self):
+        writer = EncodedChunksWriter(self.file_path, ["id"])
+        writer.write_chunk(*encode_page(build_page([{"id": 1}]), ("id",)))
+        # both chunks were encoded before the other one was written
+        writer.write_chunk(*encode_page(build_page([{"id": 2, "x": "a\nb"}]), ("id",)))
+        writer.write_chunk(*encode_page(build_page([{"id": 3, "y": 1, "x": "c"}]), ("id",)))
+        writer.writeheader()
+        writer.close()
+
+        with open(self.file_path, encoding="utf-8") as file:
+            self.assertEqual(file.read(), 'id,x,y\n1,,\n2,"a\nb",\n3,c,1\n')
+
+    def test_rows_are_mapped_onto_extended_columns(self):
+        encoder = RowEncoder(["id"])
+        rows = [{"_id": "1", "a.b": None}, {"_id": "2", "a.b": True}, {"c": 1.5, "_id": "3", "a.b": "x,y"}]
+
+        self.assertEqual(encoder.encode(rows), '1,,\n2,True,\n3,"x,y",1.5\n')
+        self.assertEqual(encoder.columns, ["id", "a_b", "c"])
+
+    def test_positions_of_sparse_rows_are_cached_up_to_the_limit(self):
+        encoder = RowEncoder(["id"])
+        rows = [{"id": i, **{f"f{j}": j for j in range(12) if i >> j & 1}} for i in range(2 * MAX_CACHED_KEY_SEQUENCES)]
+
+        encoded = encoder.encode(rows).splitlines()
+
+        self.assertLessEqual(len(encoder._positions), MAX_CACHED_KEY_SEQUENCES)
+        self.assertEqual(encoded[-1], "1999,0,1,2,3,,,6,7,8,9,10")
+
+if __name__ == "__main__":
+    unittest.main()
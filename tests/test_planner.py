@@ -0,0 +1,83 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+import unittest
+
+import mock
+
+from client.es_client import ElasticsearchClient
+from client.planner import ExtractionPlanner
+from client.throttle import AdaptiveThrottle
+
+
+def stats(documents: int, store_bytes: int) -> dict:
+    return {"_all": {"primaries": {"docs": {"count": documents}, "store": {"size_in_bytes": store_bytes}}}}
+
+
+def settings(shards: int) -> dict:
+    return {"index": {"settings": {"index": {"number_of_shards": str(shards)}}}}
+
+
+class TestExtractionPlanner(unittest.TestCase):
+    def setUp(self):
+        self.client = ElasticsearchClient(["http://localhost:9200"])
+        self.planner = ExtractionPlanner(self.client)
+
+    def plan(self, documents: int, store_bytes: int, shards: int, search=None, **kwargs):
+        probe = {"hits": {"hits": [{}] * min(documents, 100)}}
+        with (
+            mock.patch.object(ElasticsearchClient, "count", return_value={"count": documents}),
+            mock.patch("elasticsearch._sync.client.IndicesClient.stats", return_value=stats(documents, store_bytes)),
+            mock.patch("elasticsearch._sync.client.IndicesClient.get_settings", return_value=settings(shards)),
+            mock.patch.object(ElasticsearchClient, "search", side_effect=search or (lambda **_: probe)),
+        ):
+            return self.planner.plan("index", {"query": {"match_all": {}}}, **kwargs)
+
+    def test_small_index_is_downloaded_in_a_single_scroll(self):
+        plan = self.plan(500, 500 * 1000, 5, max_concurrency=4)
+
+        self.assertEqual((plan.page_size, plan.pagination, plan.concurrency), (500, "scroll", 1))
+        self.assertEqual(plan.partitions, [])
+        self.assertIsNotNone(plan.estimated_seconds)
+
+    def test_large_index_is_split_into_balanced_time_partitions(self):
+        buckets = [{"key": key, "doc_count": count} for key, count in [(0, 10), (10, 70), (20, 10), (30, 10)]]
+
+        def search(size=None, aggs=None, **kwargs):
+            if aggs and "histogram" in aggs:
+                return {"aggregations": {"histogram": {"buckets": buckets}}}
+            if aggs:
+                return {"aggregations": {"min": {"value": 0}, "max": {"value": 39}, "missing": {"doc_count": 5}}}
+            return {"hits": {"hits": [{}] * 100}}
+
+        # documents of 5 kB, so that a page holds at most 20 MB
+        plan = self.plan(2_000_000, 2_000_000 * 5 * 1024, 3, search, max_concurrency=4, time_field="created")
+
+        self.assertEqual((plan.page_size, plan.pagination, plan.concurrency), (4096, "point_in_time", 3))
+        self.assertEqual(
+            plan.partitions,
+            [
+                {"range": {"created": {"format": "epoch_millis", "lt": 10}}},
+                {"range": {"created": {"format": "epoch_millis", "gte": 10, "lt": 20}}},
+                {"range": {"created": {"format": "epoch_millis", "gte": 20}}},
+                {"bool": {"must_not": [{"exists": {"field": "created"}}]}},
+            ],
+        )
+
+        self.planner.apply(plan)
+        self.assertEqual((self.client.page_size, self.client.slices), (4096, 3))
+
+
+    def test_plan_does_not_raise_the_throttle_limits(self):
+        self.client.throttle = AdaptiveThrottle(max_concurrency=1, max_page_size=10_000, min_page_size=1_000)
+        plan = self.plan(2_000_000, 2_000_000 * 1024, 8, max_concurrency=4)
+        self.assertEqual(plan.concurrency, 4)
+
+        self.planner.apply(plan)
+
+        self.assertEqual((self.client.throttle.max_concurrency, self.client.slices), (1, 1))
+        self.assertEqual(self.client.throttle.max_page_size, plan.page_size)
+
+if __name__ == "__main__":
+    unittest.main()
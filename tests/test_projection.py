@@ -0,0 +1,51 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+import unittest
+
+from client.flattener import Flattener
+from client.projection import FieldProjection
+
+DOCUMENT = {
+    "id": 1,
+    "customer": {"name": "A", "address": {"city": "Prague", "zip": "110 00"}, "tags": ["x"]},
+    "lines": [{"sku": "S-1"}],
+    "meta.source": "web",
+    "stats": {"views": {"count": 3, "unique": 2}, "clicks": {"count": 1, "unique": 1}},
+}
+
+
+class TestFieldProjection(unittest.TestCase):
+    def flatten(self, include=(), exclude=()) -> dict:
+        return Flattener(projection=FieldProjection(include, exclude)).flatten_source(DOCUMENT)
+
+    def test_included_fields_and_subtrees(self):
+        self.assertEqual(
+            self.flatten(include=["id", "customer.address", "stats.*.count", "meta.source"]),
+            {
+                "id": 1,
+                "customer.address.city": "Prague",
+                "customer.address.zip": "110 00",
+                "meta.source": "web",
+                "stats.views.count": 3,
+                "stats.clicks.count": 1,
+            },
+        )
+
+    def test_excluded_fields_are_skipped(self):
+        self.assertEqual(
+            self.flatten(include=["customer", "stats"], exclude=["customer.address", "stats.*.unique"]),
+            {"customer.name": "A", "customer.tags": '["x"]', "stats.views.count": 3, "stats.clicks.count": 1},
+        )
+
+    def test_parent_of_an_included_field_is_not_written(self):
+        self.assertEqual(self.flatten(include=["lines.sku", "id.value"]), {})
+
+    def test_no_patterns_keep_all_fields(self):
+        self.assertFalse(FieldProjection([""], []))
+        self.assertEqual(Flattener(projection=FieldProjection()).flatten_source(DOCUMENT), Flattener().flatten_json(DOCUMENT))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,59 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+import unittest
+
+from client.query_optimizer import optimize_query
+
+MATCH = {"match": {"title": "shoes"}}
+
+
+class TestQueryOptimizer(unittest.TestCase):
+    def test_search_body_is_rewritten_for_scroll(self):
+        query = {
+            "query": MATCH,
+            "highlight": {"fields": {"title": {}}},
+            "aggs": {"brands": {"terms": {"field": "brand"}}},
+            "track_total_hits": True,
+            "_source": ["title"],
+        }
+
+        body, changes = optimize_query(query)
+
+        self.assertEqual(body, {"query": {"bool": {"filter": [MATCH]}}, "_source": ["title"], "sort": ["_doc"]})
+        self.assertEqual(len(changes), 5)
+        self.assertIn("highlight", query)
+
+    def test_point_in_time_body_is_sorted_by_shard_doc_without_total_hits(self):
+        body, _ = optimize_query({"query": {"bool": {"filter": [MATCH]}}, "sort": [{"_score": "desc"}]}, scroll=False)
+
+        self.assertEqual(
+            body, {"query": {"bool": {"filter": [MATCH]}}, "sort": ["_shard_doc"], "track_total_hits": False}
+        )
+
+    def test_explicit_sort_is_kept(self):
+        body, _ = optimize_query({"query": MATCH, "sort": [{"timestamp": "asc"}]})
+
+        self.assertEqual(body, {"query": {"bool": {"filter": [MATCH]}}, "sort": [{"timestamp": "asc"}]})
+
+    def test_scoring_is_kept_when_scores_filter_documents(self):
+        for query in (
+            {"query": MATCH, "min_score": 0.5},
+            {"query": {"function_score": {"query": MATCH, "min_score": 2}}},
+            {"query": MATCH, "sort": [{"timestamp": "asc"}, "_score"]},
+        ):
+            with self.subTest(query=query):
+                self.assertEqual(optimize_query(query), (query, []))
+
+    def test_scoring_is_kept_when_scores_are_written_to_the_output(self):
+        query = {"query": MATCH, "highlight": {"fields": {"title": {}}}}
+
+        body, changes = optimize_query(query, include_meta_fields=True)
+
+        self.assertEqual(body, {"query": MATCH})
+        self.assertEqual(changes, ["removed highlight"])
+
+
+if __name__ == "__main__":
+    unittest.main()
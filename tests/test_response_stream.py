@@ -0,0 +1,59 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+import gzip
+import io
+import json
+import unittest
+
+from hit_stream import HitStream
+from legacy_client.response_stream import CurlResponse
+
+
+class TestResponseStream(unittest.TestCase):
+    HITS = [{"_id": str(i), "_source": {"a": i, "b": "ž" * i, "c": [1, 2.5e10, {"x": None}]}} for i in range(50)]
+
+    def _build_response(self, content_encoding: str = None) -> bytes:
+        body = json.dumps(
+            {
+                "_scroll_id": "scroll-1",
+                "took": 3,
+                "hits": {"total": {"value": 50, "relation": "eq"}, "max_score": 1.25, "hits": self.HITS},
+            }
+        ).encode()
+        headers = "HTTP/1.1 100 Continue\r\n\r\nHTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+        if content_encoding == "gzip":
+            headers += "Content-Encoding: gzip\r\n"
+            body = gzip.compress(body)
+        return (headers + "\r\n").encode() + body
+
+    def test_hits_are_decoded_across_chunk_boundaries(self):
+        for chunk_size in (1, 7, 1024):
+            response = CurlResponse(io.BytesIO(self._build_response()), chunk_size=chunk_size)
+            self.assertEqual(response.read_status(), "200")
+
+            page = HitStream(response.read, chunk_size=chunk_size)
+            self.assertEqual(list(page.hits()), self.HITS)
+            self.assertEqual(page.scroll_id, "scroll-1")
+            self.assertEqual(page.total, {"value": 50, "relation": "eq"})
+
+    def test_gzip_body_is_decompressed(self):
+        response = CurlResponse(io.BytesIO(self._build_response("gzip")), chunk_size=16)
+        self.assertEqual(response.read_status(), "200")
+
+        page = HitStream(response.read, chunk_size=16)
+        self.assertEqual(list(page.hits()), self.HITS)
+        self.assertEqual(page.scroll_id, "scroll-1")
+
+    def test_empty_stream_has_no_status(self):
+        self.assertIsNone(CurlResponse(io.BytesIO(b"")).read_status())
+
+    def test_truncated_body_fails(self):
+        page = HitStream(io.BytesIO(b'{"hits": {"hits": [{"a": 1},').read)
+        with self.assertRaises(ValueError):
+            list(page.hits())
+
+
+if __name__ == "__main__":
+    unittest.main()
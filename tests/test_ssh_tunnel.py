@@ -0,0 +1,79 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+import unittest
+
+import mock
+import paramiko
+
+from client import ssh_tunnel
+from client.ssh_tunnel import SshTunnel
+
+
+def ssh_client(active: bool = True) -> mock.Mock:
+    client = mock.Mock()
+    client.get_transport.return_value.is_active.return_value = active
+    return client
+
+
+@mock.patch.object(ssh_tunnel, "RECONNECT_BACKOFF_SECONDS", 0)
+class TestSshTunnel(unittest.TestCase):
+    def setUp(self):
+        self.tunnel = SshTunnel("bastion", 22, "user", mock.Mock(), "es", 9200, keepalive_interval=15)
+
+    def test_transport_sends_keepalives(self):
+        client = ssh_client()
+        with mock.patch.object(paramiko, "SSHClient", return_value=client):
+            self.assertIs(self.tunnel._connect(), client)
+
+        client.get_transport.return_value.set_keepalive.assert_called_once_with(15)
+
+    def test_dead_session_is_re_established_before_opening_channel(self):
+        dead, new = ssh_client(active=False), ssh_client()
+        self.tunnel._client = dead
+        refused = mock.Mock(**{"connect.side_effect": paramiko.SSHException("refused")})
+        with mock.patch.object(paramiko, "SSHClient", side_effect=[refused, new]):
+            channel = self.tunnel._open_channel(("127.0.0.1", 5000))
+
+        self.assertIs(channel, new.get_transport.return_value.open_channel.return_value)
+        dead.close.assert_called_once()
+        self.assertEqual(self.tunnel.reconnects, 1)
+
+    def test_refused_forward_keeps_the_live_session(self):
+        client = ssh_client()
+        client.get_transport.return_value.open_channel.side_effect = paramiko.ChannelException(2, "Connect failed")
+        self.tunnel._client = client
+        with mock.patch.object(paramiko, "SSHClient") as ssh_client_class:
+            self.assertIsNone(self.tunnel._open_channel(("127.0.0.1", 5000)))
+
+        client.close.assert_not_called()
+        ssh_client_class.assert_not_called()
+        self.assertEqual(self.tunnel.reconnects, 0)
+
+    def test_session_dying_while_opening_channel_is_re_established(self):
+        dead, new = ssh_client(), ssh_client()
+        transport = dead.get_transport.return_value
+
+        def open_channel(*_):
+            transport.is_active.return_value = False
+            raise EOFError()
+
+        transport.open_channel.side_effect = open_channel
+        self.tunnel._client = dead
+        with mock.patch.object(paramiko, "SSHClient", return_value=new):
+            channel = self.tunnel._open_channel(("127.0.0.1", 5000))
+
+        self.assertIs(channel, new.get_transport.return_value.open_channel.return_value)
+        self.assertEqual(self.tunnel.reconnects, 1)
+
+    def test_channel_is_not_opened_when_reconnection_fails(self):
+        self.tunnel._client = ssh_client(active=False)
+        self.tunnel._reconnect_attempts = 2
+        with mock.patch.object(paramiko, "SSHClient", return_value=mock.Mock(**{"connect.side_effect": OSError})):
+            self.assertIsNone(self.tunnel._open_channel(("127.0.0.1", 5000)))
+        self.assertEqual(self.tunnel.reconnects, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
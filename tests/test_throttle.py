@@ -0,0 +1,74 @@
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.realpath(__file__)) + "/../src")
+import threading
+import unittest
+
+from client.throttle import AdaptiveThrottle
+
+
+class TestAdaptiveThrottle(unittest.TestCase):
+    def setUp(self):
+        self.throttle = AdaptiveThrottle(max_concurrency=3, max_page_size=8000, min_page_size=1000, target_took_ms=1000)
+
+    def test_fast_pages_increase_concurrency_up_to_ceiling(self):
+        for _ in range(20):
+            self.throttle.on_response(100)
+        self.assertEqual(self.throttle.concurrency, 3)
+        self.assertEqual(self.throttle.page_size, 8000)
+
+    def test_slow_pages_and_rejections_decrease_load(self):
+        for _ in range(6):
+            self.throttle.on_response(100)
+        self.assertEqual(self.throttle.concurrency, 3)
+
+        self.throttle.on_response(1500)
+        self.assertEqual((self.throttle.concurrency, self.throttle.page_size), (1, 4000))
+        self.throttle.on_rejected()
+        self.throttle.on_rejected()
+        self.assertEqual((self.throttle.concurrency, self.throttle.page_size), (1, 1000))
+
+        # the page size is restored once the concurrency is back at its ceiling
+        for _ in range(15):
+            self.throttle.on_response(100)
+        self.assertEqual((self.throttle.concurrency, self.throttle.page_size), (3, 8000))
+
+    def test_thread_pool_stats(self):
+        self.throttle.concurrency = 3
+        self.throttle.on_thread_pool_stats(queue=0, threads=10, rejected=5)
+        self.assertEqual(self.throttle.concurrency, 3)
+        self.throttle.on_thread_pool_stats(queue=0, threads=10, rejected=6)
+        self.assertEqual(self.throttle.concurrency, 1)
+
+        self.throttle.page_size = 8000
+        self.throttle.on_thread_pool_stats(queue=20, threads=10, rejected=6)
+        self.assertEqual(self.throttle.page_size, 4000)
+
+    def test_slot_limits_concurrent_requests(self):
+        self.throttle.concurrency = 2
+        active, peak = 0, 0
+        lock = threading.Lock()
+        release = threading.Event()
+
+        def request():
+            nonlocal active, peak
+            with self.throttle.slot():
+                with lock:
+                    active += 1
+                    peak = max(peak, active)
+                release.wait(1)
+                with lock:
+                    active -= 1
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(peak, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()